@@ -83,7 +83,8 @@ def trigger_curation_async(session_id: str, project_id: str, trigger: str, cwd:
             "project_id": project_id,
             "trigger": trigger,
             "claude_session_id": session_id,
-            "cwd": cwd
+            "cwd": cwd,
+            "background": True  # Server queues curation and replies right away
         },
         timeout=2  # Just enough to send, not wait for completion
     )
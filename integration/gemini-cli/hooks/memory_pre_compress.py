@@ -84,7 +84,8 @@ def trigger_curation_async(session_id: str, project_id: str, cwd: str) -> bool:
             "trigger": "pre_compact",  # Use same naming as Claude Code for compatibility
             "claude_session_id": session_id,  # CLI session ID for resumption
             "cwd": cwd,
-            "cli_type": "gemini-cli"  # Identify ourselves to the memory system
+            "cli_type": "gemini-cli",  # Identify ourselves to the memory system
+            "background": True  # Server queues curation and replies right away
         },
         timeout=2
     )
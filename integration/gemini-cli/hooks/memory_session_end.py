@@ -86,7 +86,8 @@ def trigger_curation_async(session_id: str, project_id: str, trigger: str, cwd:
             "trigger": trigger,
             "claude_session_id": session_id,  # CLI session ID for resumption
             "cwd": cwd,
-            "cli_type": "gemini-cli"  # Identify ourselves to the memory system
+            "cli_type": "gemini-cli",  # Identify ourselves to the memory system
+            "background": True  # Server queues curation and replies right away
         },
         timeout=2  # Just enough to send, not wait for completion
     )
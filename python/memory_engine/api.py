@@ -45,6 +45,7 @@ class CheckpointRequest(BaseModel):
     claude_session_id: Optional[str] = None  # CLI session ID for resumption
     cwd: Optional[str] = None  # Working directory where CLI session lives
     cli_type: Optional[Literal['claude-code', 'gemini-cli']] = None  # Which CLI is calling (default: claude-code)
+    background: bool = False  # Queue curation and return immediately (memories_curated stays 0)
 
 
 class ContextResponse(BaseModel):
@@ -179,17 +180,9 @@ class MemoryAPIWithCurator:
                 session_id = request.session_id
                 project_id = request.project_id
                 
-                # Ensure session metadata exists
-                if session_id not in self.memory_engine.session_metadata:
-                    self.memory_engine.session_metadata[session_id] = {
-                        'message_count': 0,
-                        'started_at': time.time(),
-                        'project_id': project_id,
-                        'injected_memories': set()
-                    }
-                
-                # Increment message count - this prevents primer from repeating
-                self.memory_engine.session_metadata[session_id]['message_count'] += 1
+                # Ensure session metadata exists, then increment message
+                # count - this prevents primer from repeating
+                self.memory_engine.get_or_create_session(session_id, project_id).message_count += 1
                 
                 return {
                     "success": True,
@@ -242,6 +235,24 @@ class MemoryAPIWithCurator:
                         message="Claude curator not enabled"
                     )
                 
+                if request.background:
+                    await self.memory_engine.schedule_checkpoint(
+                        session_id=request.session_id,
+                        project_id=request.project_id,
+                        trigger=request.trigger,
+                        claude_session_id=request.claude_session_id,
+                        cwd=request.cwd,
+                        cli_type=request.cli_type,
+                        priority=request.trigger == 'pre_compact'
+                    )
+                    
+                    return CheckpointResponse(
+                        success=True,
+                        trigger=request.trigger,
+                        memories_curated=0,
+                        message=f"Checkpoint queued for {request.trigger}"
+                    )
+                
                 if hasattr(self.memory_engine, 'checkpoint_session'):
                     memories_curated = await self.memory_engine.checkpoint_session(
                         session_id=request.session_id,
@@ -301,7 +312,11 @@ class MemoryAPIWithCurator:
                 "memory_size": "0 MB"
             }
             
-            # TODO: Implement actual stats gathering
+            try:
+                stats.update(self.memory_engine.storage.get_stats())
+                stats["active_sessions"] = len(self.memory_engine.session_metadata)
+            except Exception as e:
+                logger.error(f"Failed to gather stats: {e}")
             
             return stats
         
@@ -385,18 +400,19 @@ class MemoryAPIWithCurator:
                 memories = result.get('memories', [])
                 session_id = request.session_id or f"transcript-{os.path.basename(request.transcript_path)}"
                 
-                for memory in memories:
-                    # Generate embedding
-                    memory_embedding = self.memory_engine.embeddings.embed_text(memory.content)
-                    
-                    # Store memory
-                    self.memory_engine.storage.store_memory(
-                        session_id=session_id,
-                        project_id=request.project_id,
-                        memory_content=f"[CURATED_MEMORY] {memory.content}",
-                        memory_reasoning=memory.reasoning,
-                        memory_embedding=memory_embedding,
-                        metadata={
+                # Generate all embeddings in one batch, off the event loop
+                memory_embeddings = await asyncio.to_thread(
+                    self.memory_engine.embeddings.embed_batch,
+                    [memory.content for memory in memories]
+                )
+                
+                # Store all memories in one batch
+                rows = [
+                    (
+                        f"[CURATED_MEMORY] {memory.content}",
+                        memory.reasoning,
+                        memory_embedding,
+                        {
                             'curated': True,
                             'curator_version': '2.0-transcript',
                             'importance_weight': memory.importance_weight,
@@ -413,6 +429,14 @@ class MemoryAPIWithCurator:
                             'problem_solution_pair': memory.problem_solution_pair
                         }
                     )
+                    for memory, memory_embedding in zip(memories, memory_embeddings)
+                ]
+                await asyncio.to_thread(
+                    self.memory_engine.storage.store_memories,
+                    session_id,
+                    request.project_id,
+                    rows
+                )
                 
                 # Store session summary if available
                 if result.get('session_summary'):
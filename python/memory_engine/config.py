@@ -9,10 +9,17 @@ Default is now Claude Code CLI (claude command).
 
 import os
 import shlex
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from loguru import logger
 
 
+# Standard Claude Code installation path, resolved once at import
+_CLAUDE_LOCAL_PATH = Path.home() / ".claude" / "local" / "claude"
+
+
+@lru_cache(maxsize=None)
 def get_claude_command() -> str:
     """
     Get the path to the Claude CLI command.
@@ -22,7 +29,8 @@ def get_claude_command() -> str:
     2. ~/.claude/local/claude (standard Claude Code installation)
     3. 'claude' (fallback to PATH)
 
-    Returns the first one that exists.
+    Returns the first one that exists. The result is cached for the life of
+    the process, so later changes to CURATOR_COMMAND are not picked up.
     """
     # Check for explicit override
     env_command = os.getenv("CURATOR_COMMAND")
@@ -30,14 +38,14 @@ def get_claude_command() -> str:
         return env_command
 
     # Check standard Claude Code installation path (works for any user)
-    claude_local = Path.home() / ".claude" / "local" / "claude"
-    if claude_local.exists():
-        return str(claude_local)
+    if _CLAUDE_LOCAL_PATH.exists():
+        return str(_CLAUDE_LOCAL_PATH)
 
     # Fallback to PATH (might find old version, but better than nothing)
     return "claude"
 
 
+@lru_cache(maxsize=None)
 def get_gemini_command() -> str:
     """
     Get the path to the Gemini CLI command.
@@ -46,7 +54,7 @@ def get_gemini_command() -> str:
     1. GEMINI_COMMAND environment variable (explicit override)
     2. 'gemini' in PATH (standard npm global installation)
 
-    Returns the command to use.
+    Returns the command to use. Cached like get_claude_command().
     """
     # Check for explicit override
     env_command = os.getenv("GEMINI_COMMAND")
@@ -57,6 +65,7 @@ def get_gemini_command() -> str:
     return "gemini"
 
 
+@lru_cache(maxsize=None)
 def get_curator_command(cli_type: str) -> str:
     """
     Get the appropriate CLI command based on the CLI type.
@@ -72,19 +81,96 @@ def get_curator_command(cli_type: str) -> str:
     else:
         return get_claude_command()
 
+
+class _PlaceholderSentinels(dict):
+    """Maps every template field to a unique sentinel string."""
+
+    def __missing__(self, key: str) -> str:
+        return f"\x00{key}\x00"
+
+
+# Kinds of compiled template tokens
+_LITERAL, _PLACEHOLDER, _EMBEDDED = range(3)
+
+
+@lru_cache(maxsize=32)
+def _compile_template(template: str) -> Tuple[Tuple[int, str], ...]:
+    """
+    Compile a command template into argv parts once.
+
+    Placeholders are swapped for sentinels before shlex runs, so the
+    (pure Python) tokenizer only ever sees each template a single time.
+    Each resulting token is tagged as:
+    - _LITERAL: used as-is
+    - _PLACEHOLDER: the whole token is one field, stored as its name
+    - _EMBEDDED: a field inside a larger token, stored as a format string
+    """
+    parts = []
+    for token in shlex.split(template.format_map(_PlaceholderSentinels())):
+        if "\x00" not in token:
+            parts.append((_LITERAL, token))
+            continue
+
+        pieces = token.split("\x00")
+        if len(pieces) == 3 and not pieces[0] and not pieces[2]:
+            parts.append((_PLACEHOLDER, pieces[1]))
+        else:
+            # Even pieces are literal text, odd pieces are field names
+            fmt = "".join(
+                "{" + piece + "}" if i % 2 else piece.replace("{", "{{").replace("}", "}}")
+                for i, piece in enumerate(pieces)
+            )
+            parts.append((_EMBEDDED, fmt))
+    return tuple(parts)
+
+
+@lru_cache(maxsize=8)
+def _split_command(command: str) -> Tuple[str, ...]:
+    """Split the curator command, which may carry its own arguments."""
+    return tuple(shlex.split(command))
+
+
+def _render_template(template: str, **values: str) -> List[str]:
+    """
+    Build argv from a command template.
+
+    The {command} placeholder expands to the split curator command; every
+    other value is substituted verbatim, so quotes or spaces inside a
+    prompt can no longer break the argument boundaries. Unknown fields
+    raise KeyError, as str.format would.
+    """
+    cmd = []
+    for kind, text in _compile_template(template):
+        if kind == _LITERAL:
+            cmd.append(text)
+        elif kind == _PLACEHOLDER:
+            if text == "command":
+                cmd.extend(_split_command(values["command"]))
+            else:
+                cmd.append(values[text])
+        else:
+            cmd.append(text.format_map(values))
+    return cmd
+
+
+# Supported retrieval strategies
+VALID_RETRIEVAL_MODES = frozenset({"smart_vector", "claude", "hybrid"})
+
+
 class MemoryEngineConfig:
     """Configuration for the memory engine."""
     
     def __init__(self):
         """Initialize memory engine configuration from environment or defaults."""
+        env = os.environ
+        
         # Retrieval mode configuration
         # Options: "smart_vector" (default), "claude", "hybrid"
-        self.retrieval_mode = os.getenv("MEMORY_RETRIEVAL_MODE", "smart_vector")
+        self.retrieval_mode = env.get("MEMORY_RETRIEVAL_MODE", "smart_vector")
         
         # Validate retrieval mode
-        valid_modes = ["smart_vector", "claude", "hybrid"]
-        if self.retrieval_mode not in valid_modes:
-            raise ValueError(f"Invalid MEMORY_RETRIEVAL_MODE: {self.retrieval_mode}. Must be one of {valid_modes}")
+        if self.retrieval_mode not in VALID_RETRIEVAL_MODES:
+            raise ValueError(f"Invalid MEMORY_RETRIEVAL_MODE: {self.retrieval_mode}. Must be one of {sorted(VALID_RETRIEVAL_MODES)}")
 
 
 class CuratorConfig:
@@ -92,12 +178,14 @@ class CuratorConfig:
     
     # Pre-defined templates for different CLI implementations
     # Note: {command} will be replaced with the detected CLI path
+    # Templates without a {prompt} field get the prompt on stdin instead of
+    # argv (a single argument is capped at 128 KB on Linux)
     TEMPLATES = {
         'claude-code': {
             'session_resume': '{command} --resume {session_id} -p "{user_message}" --append-system-prompt "{system_prompt}" --output-format json',
-            'direct_query': '{command} -p "{prompt}" --append-system-prompt "{system_prompt}" --output-format json --max-turns 1',
+            'direct_query': '{command} -p --append-system-prompt "{system_prompt}" --output-format json --max-turns 1',
             # One-shot transcript curation - no session resumption, just analyze provided transcript
-            'transcript_curation': '{command} -p "{prompt}" --output-format json --max-turns 1'
+            'transcript_curation': '{command} -p --output-format json --max-turns 1'
         },
         'one-claude': {
             'session_resume': '{command} -n --resume {session_id} --system-prompt "{system_prompt}" --format json "{user_message}"',
@@ -114,13 +202,23 @@ class CuratorConfig:
         }
     }
     
+    # CLI types with built-in templates
+    VALID_CLI_TYPES = frozenset(TEMPLATES)
+    
+    @classmethod
+    def resolve_templates(cls, cli_type: str) -> dict:
+        """Get the built-in templates for a CLI type (claude-code if unknown)."""
+        return cls.TEMPLATES[cli_type if cli_type in cls.VALID_CLI_TYPES else 'claude-code']
+    
     def __init__(self):
         """Initialize curator configuration from environment or defaults."""
+        env = os.environ
+        
         # Which CLI implementation to use: "claude-code" (default), "one-claude", or "gemini-cli"
-        self.cli_type = os.getenv("CURATOR_CLI_TYPE", "claude-code")
+        self.cli_type = env.get("CURATOR_CLI_TYPE", "claude-code")
 
         # Get default template based on CLI type
-        default_template = self.TEMPLATES.get(self.cli_type, self.TEMPLATES['claude-code'])
+        default_template = self.resolve_templates(self.cli_type)
 
         # The command to execute for curation
         # Uses smart detection based on CLI type
@@ -128,28 +226,56 @@ class CuratorConfig:
         
         # Command template for session resumption
         # Users can override this with their own template
-        self.session_resume_template = os.getenv(
+        self.session_resume_template = env.get(
             "CURATOR_SESSION_RESUME_TEMPLATE", 
             default_template['session_resume']
         )
         
         # Command template for direct queries (used in hybrid retrieval)
         # This is for memory selection, not curation
-        self.direct_query_template = os.getenv(
+        self.direct_query_template = env.get(
             "CURATOR_DIRECT_QUERY_TEMPLATE",
             default_template['direct_query']
         )
         
         # Command template for one-shot transcript curation
         # Used when we have a transcript (JSONL) and want to curate without session resumption
-        self.transcript_curation_template = os.getenv(
+        self.transcript_curation_template = env.get(
             "CURATOR_TRANSCRIPT_TEMPLATE",
             default_template['transcript_curation']
         )
         
         # Additional flags that might be needed for specific implementations
-        self.extra_flags = os.getenv("CURATOR_EXTRA_FLAGS", "").split()
+        self.extra_flags = tuple(env.get("CURATOR_EXTRA_FLAGS", "").split())
+        
+        # Seconds before a direct query (memory selection at retrieval time)
+        # is killed; 0 disables. Session curation is never time-limited.
+        query_timeout = self._env_number(env, "CURATOR_QUERY_TIMEOUT", 120.0, float)
+        self.query_timeout = query_timeout if query_timeout > 0 else None
+        
+        # Upper bound on curator CLI processes running at once
+        self.max_concurrency = self._env_number(env, "CURATOR_MAX_CONCURRENCY", 8, int, minimum=1)
         
+        # Keep only the N most important memories from one curation;
+        # 0 or unset keeps everything the curator returns
+        self.max_memories = self._env_number(env, "CURATOR_MAX_MEMORIES", 0, int) or None
+        
+    @staticmethod
+    def _env_number(env, name: str, default, cast, minimum=0):
+        """Read a numeric setting, falling back to default on bad or too-small values"""
+        raw = env.get(name, "").strip()
+        if not raw:
+            return default
+        try:
+            value = cast(raw)
+        except ValueError:
+            value = None
+        # 'not >=' also rejects NaN
+        if value is None or not value >= minimum:
+            logger.warning(f"Ignoring invalid {name}={raw!r}, using {default}")
+            return default
+        return value
+    
     def get_session_resume_command(self, session_id: str, system_prompt: str, user_message: str) -> List[str]:
         """
         Build the command for resuming a session with the curator.
@@ -162,20 +288,17 @@ class CuratorConfig:
         Returns:
             List of command arguments
         """
-        # Build command from template
-        cmd_string = self.session_resume_template.format(
+        # Build command from the pre-tokenized template
+        cmd = _render_template(
+            self.session_resume_template,
             command=self.curator_command,
             session_id=session_id,
             system_prompt=system_prompt,
             user_message=user_message
         )
         
-        # Use shlex to properly handle quoted arguments
-        cmd = shlex.split(cmd_string)
-        
         # Add any extra flags
-        if self.extra_flags:
-            cmd.extend(self.extra_flags)
+        cmd.extend(self.extra_flags)
             
         return cmd
     
@@ -190,22 +313,30 @@ class CuratorConfig:
         Returns:
             List of command arguments
         """
-        # Build command from template
-        cmd_string = self.direct_query_template.format(
+        # Build command from the pre-tokenized template
+        cmd = _render_template(
+            self.direct_query_template,
             command=self.curator_command,
             system_prompt=system_prompt,
             prompt=prompt
         )
         
-        # Use shlex to properly handle quoted arguments
-        cmd = shlex.split(cmd_string)
-        
         # Add any extra flags
-        if self.extra_flags:
-            cmd.extend(self.extra_flags)
+        cmd.extend(self.extra_flags)
             
         return cmd
     
+    @staticmethod
+    def prompt_stdin(template: str, prompt: str) -> Optional[bytes]:
+        """
+        Get the bytes to pipe to the CLI's stdin for a prompt.
+        
+        Returns None when the template puts the prompt on the command line.
+        """
+        if "{prompt}" in template:
+            return None
+        return prompt.encode("utf-8")
+    
     def get_transcript_curation_command(self, prompt: str) -> List[str]:
         """
         Build the command for one-shot transcript curation.
@@ -219,18 +350,15 @@ class CuratorConfig:
         Returns:
             List of command arguments
         """
-        # Build command from template
-        cmd_string = self.transcript_curation_template.format(
+        # Build command from the pre-tokenized template
+        cmd = _render_template(
+            self.transcript_curation_template,
             command=self.curator_command,
             prompt=prompt
         )
         
-        # Use shlex to properly handle quoted arguments
-        cmd = shlex.split(cmd_string)
-        
         # Add any extra flags
-        if self.extra_flags:
-            cmd.extend(self.extra_flags)
+        cmd.extend(self.extra_flags)
             
         return cmd
 
@@ -5,7 +5,9 @@ Converts text into semantic vectors for similarity matching and memory retrieval
 Uses efficient, lightweight models optimized for real-time operation.
 """
 
-from typing import List, Union
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from loguru import logger
@@ -21,6 +23,10 @@ class EmbeddingGenerator:
     - Memory-efficient operation
     """
     
+    # Recent text -> vector entries kept in memory (texts are immutable, so
+    # repeated queries and memory contents never need a second forward pass)
+    CACHE_SIZE = 1024
+    
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
         """
         Initialize embedding model.
@@ -32,6 +38,8 @@ class EmbeddingGenerator:
         """
         self.model_name = model_name
         self.model = None
+        self._cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._cache_lock = threading.Lock()  # embed calls may run in worker threads
         self._load_model()
     
     def _load_model(self):
@@ -44,7 +52,7 @@ class EmbeddingGenerator:
             logger.error(f"Failed to load embedding model: {e}")
             raise
     
-    def embed_text(self, text: str) -> List[float]:
+    def embed_text(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text.
         
@@ -52,20 +60,38 @@ class EmbeddingGenerator:
             text: Input text to embed
             
         Returns:
-            List of float values representing the embedding vector
+            float32 numpy array representing the embedding vector
         """
         if not text or not text.strip():
-            return [0.0] * self.get_embedding_dimension()
+            return np.zeros(self.get_embedding_dimension(), dtype=np.float32)
+        
+        key = text.strip()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
         
         try:
             # Generate embedding
-            embedding = self.model.encode(text.strip(), convert_to_numpy=True)
-            return embedding.tolist()
+            embedding = self.model.encode(key, convert_to_numpy=True)
+            embedding = embedding.astype(np.float32, copy=False)
+            self._cache_put(key, embedding)
+            return embedding
         except Exception as e:
             logger.error(f"Failed to generate embedding: {e}")
-            return [0.0] * self.get_embedding_dimension()
+            return np.zeros(self.get_embedding_dimension(), dtype=np.float32)
     
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+    def _cache_put(self, key: str, embedding: np.ndarray):
+        """Remember an embedding, evicting the least recently used entry"""
+        # Cached vectors are shared between callers, so make them read-only
+        embedding.flags.writeable = False
+        with self._cache_lock:
+            self._cache[key] = embedding
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+    
+    def embed_batch(self, texts: List[str]) -> List[np.ndarray]:
         """
         Generate embeddings for multiple texts efficiently.
         
@@ -73,7 +99,7 @@ class EmbeddingGenerator:
             texts: List of texts to embed
             
         Returns:
-            List of embedding vectors
+            List of float32 embedding vectors
         """
         if not texts:
             return []
@@ -82,14 +108,33 @@ class EmbeddingGenerator:
             # Clean and prepare texts
             clean_texts = [text.strip() if text and text.strip() else " " for text in texts]
             
-            # Batch embedding generation
-            embeddings = self.model.encode(clean_texts, convert_to_numpy=True)
-            return [emb.tolist() for emb in embeddings]
+            # Serve repeats from the cache; only misses go to the model
+            results: List[Optional[np.ndarray]] = [None] * len(clean_texts)
+            missing: Dict[str, List[int]] = {}
+            with self._cache_lock:
+                for i, key in enumerate(clean_texts):
+                    cached = self._cache.get(key)
+                    if cached is not None:
+                        self._cache.move_to_end(key)
+                        results[i] = cached
+                    else:
+                        missing.setdefault(key, []).append(i)
+            
+            if missing:
+                # Batch embedding generation (each distinct text once)
+                keys = list(missing)
+                embeddings = self.model.encode(keys, convert_to_numpy=True).astype(np.float32, copy=False)
+                for key, embedding in zip(keys, embeddings):
+                    self._cache_put(key, embedding)
+                    for i in missing[key]:
+                        results[i] = embedding
+            
+            return results
         except Exception as e:
             logger.error(f"Failed to generate batch embeddings: {e}")
             # Return zero vectors as fallback
             dim = self.get_embedding_dimension()
-            return [[0.0] * dim for _ in texts]
+            return list(np.zeros((len(texts), dim), dtype=np.float32))
     
     def get_embedding_dimension(self) -> int:
         """Get the dimension of embeddings produced by this model"""
@@ -97,7 +142,9 @@ class EmbeddingGenerator:
             return 384  # Default for all-MiniLM-L6-v2
         return self.model.get_sentence_embedding_dimension()
     
-    def compute_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
+    def compute_similarity(self,
+                           embedding1: Union[np.ndarray, List[float]],
+                           embedding2: Union[np.ndarray, List[float]]) -> float:
         """
         Compute cosine similarity between two embeddings.
         
@@ -109,9 +156,9 @@ class EmbeddingGenerator:
             Similarity score between -1 and 1 (higher = more similar)
         """
         try:
-            # Convert to numpy arrays
-            vec1 = np.array(embedding1)
-            vec2 = np.array(embedding2)
+            # Convert to numpy arrays (no copy for arrays we produced)
+            vec1 = np.asarray(embedding1)
+            vec2 = np.asarray(embedding2)
             
             # Compute cosine similarity
             dot_product = np.dot(vec1, vec2)
@@ -128,8 +175,8 @@ class EmbeddingGenerator:
             return 0.0
     
     def find_most_similar(self, 
-                         query_embedding: List[float], 
-                         candidate_embeddings: List[List[float]],
+                         query_embedding: Union[np.ndarray, List[float]], 
+                         candidate_embeddings: List[Union[np.ndarray, List[float]]],
                          top_k: int = 5) -> List[tuple]:
         """
         Find the most similar embeddings to a query.
@@ -142,14 +189,26 @@ class EmbeddingGenerator:
         Returns:
             List of (index, similarity_score) tuples, sorted by similarity
         """
-        if not candidate_embeddings:
+        if not candidate_embeddings or top_k <= 0:
             return []
         
-        similarities = []
-        for i, candidate in enumerate(candidate_embeddings):
-            similarity = self.compute_similarity(query_embedding, candidate)
-            similarities.append((i, similarity))
+        try:
+            # One matrix-vector product over all candidates instead of a
+            # Python-level cosine per row
+            matrix = np.asarray(candidate_embeddings, dtype=np.float32)
+            query = np.asarray(query_embedding, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+            scores = np.divide(matrix @ query, norms,
+                               out=np.zeros(len(matrix), dtype=np.float32),
+                               where=norms != 0)
+        except Exception as e:
+            logger.error(f"Failed to compute similarities: {e}")
+            return []
         
-        # Sort by similarity (highest first) and return top_k
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return similarities[:top_k]
\ No newline at end of file
+        # Partial selection of the top_k, then order just those (highest first)
+        if top_k < len(scores):
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(i), float(scores[i])) for i in top]
@@ -4,6 +4,7 @@ Enhanced logging configuration for memory system validation.
 Provides detailed, colorful logging to track memory storage and retrieval.
 """
 
+import os
 import sys
 from loguru import logger
 from rich.console import Console
@@ -12,8 +13,28 @@ from rich.logging import RichHandler
 # Rich console for beautiful output
 console = Console()
 
+# Lowest level any sink accepts, set by setup_validation_logging
+# (0 until then: loguru's default handler takes everything)
+_MIN_LOG_LEVEL = 0
+
 def setup_validation_logging():
-    """Configure enhanced logging for validation phase"""
+    """
+    Configure enhanced logging for validation phase.
+    
+    MEMORY_LOG_LEVEL (e.g. WARNING, any case) sets the level of both sinks;
+    when unset or unknown the console logs INFO and the file keeps full
+    DEBUG detail.
+    """
+    global _MIN_LOG_LEVEL
+    raw_level = os.getenv("MEMORY_LOG_LEVEL", "").strip()
+    log_level = raw_level.upper() or None
+    if log_level is not None:
+        try:
+            logger.level(log_level)
+        except ValueError:
+            log_level = None
+    console_level = log_level or "INFO"
+    file_level = log_level or "DEBUG"
     
     # Remove default handler
     logger.remove()
@@ -22,7 +43,7 @@ def setup_validation_logging():
     logger.add(
         RichHandler(console=console, rich_tracebacks=True),
         format="{message}",
-        level="INFO"
+        level=console_level
     )
     
     # Add file handler for detailed logs
@@ -30,15 +51,32 @@ def setup_validation_logging():
         "memory_validation.log",
         rotation="10 MB",
         retention="7 days",
-        level="DEBUG",
+        level=file_level,
         format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {module}:{function}:{line} | {message}"
     )
     
+    _MIN_LOG_LEVEL = min(logger.level(console_level).no, logger.level(file_level).no)
+    if raw_level and log_level is None:
+        logger.warning(f"Unknown MEMORY_LOG_LEVEL={raw_level!r}, using the default levels")
     return logger
 
-# Memory operation decorators for clear logging
+def log_enabled(level: str) -> bool:
+    """
+    Check whether any sink will accept messages at this level.
+
+    loguru formats f-string arguments before it filters, so guard loops
+    that build many detailed log lines with this check.
+    """
+    return _MIN_LOG_LEVEL <= logger.level(level).no
+
+# Memory operation decorators for clear logging. Set
+# MEMORY_DECORATOR_LOGGING=false to apply them as plain passthroughs.
+_DECORATOR_LOGGING = os.getenv("MEMORY_DECORATOR_LOGGING", "true").lower() not in ("false", "0", "no")
+
 def log_storage(func):
     """Decorator to log storage operations"""
+    if not _DECORATOR_LOGGING:
+        return func
     def wrapper(*args, **kwargs):
         logger.info("━" * 60)
         logger.info("📥 MEMORY STORAGE OPERATION")
@@ -50,6 +88,8 @@ def log_storage(func):
 
 def log_retrieval(func):
     """Decorator to log retrieval operations"""
+    if not _DECORATOR_LOGGING:
+        return func
     def wrapper(*args, **kwargs):
         logger.info("━" * 60)
         logger.info("🔍 MEMORY RETRIEVAL OPERATION")
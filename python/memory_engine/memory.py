@@ -5,19 +5,20 @@ Consciousness helping consciousness remember what matters.
 
 import time
 import asyncio
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Any
+from dataclasses import dataclass, field
 from loguru import logger
 
 from .embeddings import EmbeddingGenerator
 from .storage import MemoryStorage
 from .curator import Curator, CuratedMemory
 from .session_primer import SessionPrimerGenerator
-from .logging_config import log_storage, log_retrieval, validation_logger as vlog
-from .retrieval_strategies import SmartVectorRetrieval, HybridRetrieval
+from .logging_config import log_storage, log_retrieval, log_enabled, validation_logger as vlog
+from .retrieval_strategies import SmartVectorRetrieval, HybridRetrieval, cosine_similarities
+from .utils import truncate
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationContext:
     """Represents the context for a conversation session"""
     session_id: str
@@ -27,6 +28,15 @@ class ConversationContext:
     timestamp: float
 
 
+@dataclass(slots=True)
+class SessionState:
+    """Per-session tracking kept between requests"""
+    project_id: Optional[str]
+    started_at: float
+    message_count: int = 0
+    injected_memories: Set[str] = field(default_factory=set)  # Track which memories have been shown
+
+
 class MemoryEngine:
     """
     Pure curator-based memory engine.
@@ -70,14 +80,73 @@ class MemoryEngine:
             raise ValueError(f"Unknown retrieval mode: {retrieval_mode}")
         
         # Session management
-        self.session_metadata = {}
+        self.session_metadata: Dict[str, SessionState] = {}
         self.last_checkpoint = {}
         
+        # Background checkpoint queue, created on first use (needs a running loop)
+        self._checkpoint_queue: Optional[asyncio.Queue] = None
+        self._checkpoint_worker: Optional[asyncio.Task] = None
+        self._priority_checkpoints: set = set()
+        
+        # Formatted context line per curated memory id (memory content never
+        # changes after curation, so each line is built once)
+        self._display_lines: Dict[str, str] = {}
+        
         logger.info(f"🌟 Memory Engine initialized - {retrieval_mode} retrieval mode")
         logger.info("💫 Pure curator approach - consciousness helping consciousness")
     
     # No phases in curator-only approach - memories are used when relevant
     
+    def get_or_create_session(self, session_id: str, project_id: Optional[str], now: Optional[float] = None) -> SessionState:
+        """Return the state for a session, creating it on first sight"""
+        session = self.session_metadata.get(session_id)
+        if session is None:
+            session = self.session_metadata[session_id] = SessionState(
+                project_id=project_id,
+                started_at=now if now is not None else time.time()
+            )
+        return session
+    
+    # Pending background checkpoints; schedule_checkpoint waits once this is full
+    CHECKPOINT_QUEUE_SIZE = 32
+    
+    async def schedule_checkpoint(self, session_id: str, project_id: str, trigger: str = "session_end", claude_session_id: Optional[str] = None, cwd: Optional[str] = None, cli_type: Optional[str] = None, priority: bool = False) -> None:
+        """
+        Queue a checkpoint for the background worker and return without
+        waiting for curation. Blocks only while the queue is full.
+        
+        Priority checkpoints (e.g. pre-compaction, where the context is about
+        to be rewritten) skip the queue and start right away.
+        """
+        if priority:
+            task = asyncio.create_task(
+                self.checkpoint_session(session_id, project_id, trigger, claude_session_id, cwd, cli_type)
+            )
+            # Keep a reference so the task isn't garbage collected mid-run
+            self._priority_checkpoints.add(task)
+            task.add_done_callback(self._priority_checkpoints.discard)
+            vlog.info(f"⚡ Priority checkpoint started: {trigger}")
+            return
+        
+        if self._checkpoint_queue is None:
+            self._checkpoint_queue = asyncio.Queue(maxsize=self.CHECKPOINT_QUEUE_SIZE)
+        if self._checkpoint_worker is None or self._checkpoint_worker.done():
+            self._checkpoint_worker = asyncio.create_task(self._run_checkpoint_worker())
+        
+        await self._checkpoint_queue.put((session_id, project_id, trigger, claude_session_id, cwd, cli_type))
+        vlog.info(f"📥 Checkpoint queued: {trigger} ({self._checkpoint_queue.qsize()} pending)")
+    
+    async def _run_checkpoint_worker(self):
+        """Run queued checkpoints one at a time"""
+        while True:
+            session_id, project_id, trigger, claude_session_id, cwd, cli_type = await self._checkpoint_queue.get()
+            try:
+                await self.checkpoint_session(session_id, project_id, trigger, claude_session_id, cwd, cli_type)
+            except Exception as e:
+                logger.error(f"Background checkpoint failed: {e}")
+            finally:
+                self._checkpoint_queue.task_done()
+    
     async def checkpoint_session(self, session_id: str, project_id: str, trigger: str = "session_end", claude_session_id: Optional[str] = None, cwd: Optional[str] = None, cli_type: Optional[str] = None) -> int:
         """
         Run curator at a checkpoint to extract important memories.
@@ -97,7 +166,8 @@ class MemoryEngine:
 
         # For session resume approach, we don't need to track messages ourselves
         # because Claude Code already has the full context from the session
-        message_count = self.session_metadata.get(session_id, {}).get('message_count', 0)
+        session = self.session_metadata.get(session_id)
+        message_count = session.message_count if session else 0
 
         # If we have a claude_session_id, we can resume even without tracking
         # (this enables curation after server restart)
@@ -152,44 +222,31 @@ class MemoryEngine:
             # Log curated memories
             vlog.info(f"🧠 CLAUDE CURATOR EXTRACTED {len(curated_memories)} MEMORIES:")
             vlog.info("=" * 80)
-            for i, memory in enumerate(curated_memories):
-                vlog.info(f"\n💎 CURATED MEMORY #{i+1}:")
-                vlog.info(f"   📝 Content: \"{memory.content}\"")
-                vlog.info(f"   🤔 Why important: {memory.reasoning}")
-                vlog.info(f"   💪 Weight: {memory.importance_weight:.2f}")
-                vlog.info(f"   🎯 Type: {memory.context_type}")
-                vlog.info(f"   🏷️  Tags: {', '.join(memory.semantic_tags) if isinstance(memory.semantic_tags, list) else memory.semantic_tags}")
-                vlog.info(f"   ⏳ Temporal: {memory.temporal_relevance}")
-                vlog.info(f"   🔴 Action required: {'YES' if memory.action_required else 'No'}")
-                if memory.trigger_phrases:
-                    vlog.info(f"   🎯 Trigger phrases: {', '.join(memory.trigger_phrases)}")
-                if memory.question_types:
-                    vlog.info(f"   ❓ Answers questions: {', '.join(memory.question_types)}")
-                if memory.emotional_resonance:
-                    vlog.info(f"   💝 Emotional context: {memory.emotional_resonance}")
-                if memory.problem_solution_pair:
-                    vlog.info(f"   🔧 Problem→Solution pattern")
+            if log_enabled("INFO"):
+                vlog.info(self._describe_curated_memories(curated_memories))
             vlog.info("=" * 80)
             
+            # Embed all curated memories in one batch (one model pass), off the event loop
+            memory_embeddings = await asyncio.to_thread(
+                self.embeddings.embed_batch, [memory.content for memory in curated_memories]
+            )
+            now = time.time()  # One timestamp for every memory from this curation
+            
             # Store curated memories
-            for idx, memory in enumerate(curated_memories):
-                vlog.info(f"💾 STORING CURATED MEMORY {idx+1}/{len(curated_memories)}:")
-                vlog.info(f"   Content: {memory.content}")
-                vlog.info(f"   Full document text: [CURATED_MEMORY] {memory.content}")
-                
-                # Generate embedding for the curated memory
-                memory_embedding = self.embeddings.embed_text(memory.content)
-                vlog.info(f"   Embedding generated: {len(memory_embedding)} dimensions")
+            rows = []
+            verbose = log_enabled("INFO")
+            for idx, (memory, memory_embedding) in enumerate(zip(curated_memories, memory_embeddings)):
+                if verbose:
+                    vlog.info(f"💾 STORING CURATED MEMORY {idx+1}/{len(curated_memories)}:")
+                    vlog.info(f"   Content: {memory.content}")
+                    vlog.info(f"   Full document text: [CURATED_MEMORY] {memory.content}")
+                    vlog.info(f"   Embedding generated: {len(memory_embedding)} dimensions")
                 
-                # Store the curated memory
-                memory_id = self.storage.store_memory(
-                    session_id=session_id,
-                    project_id=project_id,
-                    memory_content=f"[CURATED_MEMORY] {memory.content}",
-                    memory_reasoning=memory.reasoning,
-                    memory_embedding=memory_embedding,
-                    timestamp=time.time(),
-                    metadata={
+                rows.append((
+                    f"[CURATED_MEMORY] {memory.content}",
+                    memory.reasoning,
+                    memory_embedding,
+                    {
                         'curated': True,
                         'curator_version': '1.0',
                         'importance_weight': memory.importance_weight,
@@ -206,11 +263,15 @@ class MemoryEngine:
                         'emotional_resonance': memory.emotional_resonance,
                         'problem_solution_pair': memory.problem_solution_pair
                     }
-                )
-                vlog.info(f"   ✅ Stored with memory ID: {memory_id}")
+                ))
+            
+            # Store every curated memory in one SQLite transaction and one ChromaDB add
+            if rows:
+                memory_ids = await asyncio.to_thread(self.storage.store_memories, session_id, project_id, rows, now)
+                vlog.info(f"   ✅ Stored {len(memory_ids)} memories: {', '.join(memory_ids)}")
             
             # Mark checkpoint time
-            self.last_checkpoint[session_id] = time.time()
+            self.last_checkpoint[session_id] = now
             
             # If this was the first session and we curated memories, mark it as completed
             if curated_memories and self.storage.is_first_session_for_project(project_id):
@@ -290,43 +351,30 @@ class MemoryEngine:
             # Log curated memories
             vlog.info(f"🧠 TRANSCRIPT CURATOR EXTRACTED {len(curated_memories)} MEMORIES:")
             vlog.info("=" * 80)
-            for i, memory in enumerate(curated_memories):
-                vlog.info(f"\n💎 CURATED MEMORY #{i+1}:")
-                vlog.info(f"   📝 Content: \"{memory.content}\"")
-                vlog.info(f"   🤔 Why important: {memory.reasoning}")
-                vlog.info(f"   💪 Weight: {memory.importance_weight:.2f}")
-                vlog.info(f"   🎯 Type: {memory.context_type}")
-                vlog.info(f"   🏷️  Tags: {', '.join(memory.semantic_tags) if isinstance(memory.semantic_tags, list) else memory.semantic_tags}")
-                vlog.info(f"   ⏳ Temporal: {memory.temporal_relevance}")
-                vlog.info(f"   🔴 Action required: {'YES' if memory.action_required else 'No'}")
-                if memory.trigger_phrases:
-                    vlog.info(f"   🎯 Trigger phrases: {', '.join(memory.trigger_phrases)}")
-                if memory.question_types:
-                    vlog.info(f"   ❓ Answers questions: {', '.join(memory.question_types)}")
-                if memory.emotional_resonance:
-                    vlog.info(f"   💝 Emotional context: {memory.emotional_resonance}")
-                if memory.problem_solution_pair:
-                    vlog.info(f"   🔧 Problem→Solution pattern")
+            if log_enabled("INFO"):
+                vlog.info(self._describe_curated_memories(curated_memories))
             vlog.info("=" * 80)
             
+            # Embed all curated memories in one batch (one model pass), off the event loop
+            memory_embeddings = await asyncio.to_thread(
+                self.embeddings.embed_batch, [memory.content for memory in curated_memories]
+            )
+            now = time.time()  # One timestamp for every memory from this curation
+            
             # Store curated memories (same logic as checkpoint_session)
-            for idx, memory in enumerate(curated_memories):
-                vlog.info(f"💾 STORING CURATED MEMORY {idx+1}/{len(curated_memories)}:")
-                vlog.info(f"   Content: {memory.content}")
-                
-                # Generate embedding for the curated memory
-                memory_embedding = self.embeddings.embed_text(memory.content)
-                vlog.info(f"   Embedding generated: {len(memory_embedding)} dimensions")
+            rows = []
+            verbose = log_enabled("INFO")
+            for idx, (memory, memory_embedding) in enumerate(zip(curated_memories, memory_embeddings)):
+                if verbose:
+                    vlog.info(f"💾 STORING CURATED MEMORY {idx+1}/{len(curated_memories)}:")
+                    vlog.info(f"   Content: {memory.content}")
+                    vlog.info(f"   Embedding generated: {len(memory_embedding)} dimensions")
                 
-                # Store the curated memory
-                memory_id = self.storage.store_memory(
-                    session_id=session_id,
-                    project_id=project_id,
-                    memory_content=f"[CURATED_MEMORY] {memory.content}",
-                    memory_reasoning=memory.reasoning,
-                    memory_embedding=memory_embedding,
-                    timestamp=time.time(),
-                    metadata={
+                rows.append((
+                    f"[CURATED_MEMORY] {memory.content}",
+                    memory.reasoning,
+                    memory_embedding,
+                    {
                         'curated': True,
                         'curator_version': '2.0-transcript',  # Mark as transcript-based
                         'importance_weight': memory.importance_weight,
@@ -344,11 +392,15 @@ class MemoryEngine:
                         'emotional_resonance': memory.emotional_resonance,
                         'problem_solution_pair': memory.problem_solution_pair
                     }
-                )
-                vlog.info(f"   ✅ Stored with memory ID: {memory_id}")
+                ))
+            
+            # Store every curated memory in one SQLite transaction and one ChromaDB add
+            if rows:
+                memory_ids = await asyncio.to_thread(self.storage.store_memories, session_id, project_id, rows, now)
+                vlog.info(f"   ✅ Stored {len(memory_ids)} memories: {', '.join(memory_ids)}")
             
             # Mark checkpoint time
-            self.last_checkpoint[session_id] = time.time()
+            self.last_checkpoint[session_id] = now
             
             # If this was the first session and we curated memories, mark it as completed
             if curated_memories and self.storage.is_first_session_for_project(project_id):
@@ -375,55 +427,42 @@ class MemoryEngine:
         
         Uses Claude to select most relevant memories.
         """
-        vlog.info(f"🔍 Getting context for session: {session_id}")
-        vlog.info(f"💭 Current message: {current_message[:80]}...")
+        now = time.time()  # One clock read per request
+        
+        if log_enabled("INFO"):
+            vlog.info(f"🔍 Getting context for session: {session_id}")
+            vlog.info(f"💭 Current message: {truncate(current_message, 80)}")
         
         # Check if this is a first session for the project
         is_first_session = False
         if not project_id:
             logger.warning("No project_id provided - cannot retrieve memories")
-            all_memories = []
         else:
             # Ensure project exists in database
             self.storage.ensure_project_exists(project_id)
             
-            # Check if this is the first session
+            # Check if this is the first session (a flag on the project row;
+            # memories themselves are only loaded when actually needed)
             is_first_session = self.storage.is_first_session_for_project(project_id)
-            
-            # Get memories if not first session
-            if not is_first_session:
-                all_memories = self.storage.get_all_curated_memories(project_id)
-            else:
-                all_memories = []
+            if is_first_session:
                 vlog.info("🎉 FIRST SESSION for this project - no memories to retrieve")
         
         # Get or create session metadata
-        if session_id not in self.session_metadata:
-            self.session_metadata[session_id] = {
-                'message_count': 0,
-                'started_at': time.time(),
-                'project_id': project_id,
-                'injected_memories': set()  # Track which memories have been shown
-            }
-        
-        message_count = self.session_metadata[session_id]['message_count']
+        message_count = self.get_or_create_session(session_id, project_id, now).message_count
         
         # Generate session primer for subsequent sessions
         if not is_first_session and message_count == 0:
             vlog.info("🌟 SUBSEQUENT SESSION DETECTED!")
             vlog.info("🧠 Activating consciousness continuity primer...")
             vlog.info("💫 Claude will receive context from previous sessions")
-            vlog.info(f"📊 Found {len(all_memories)} total curated memories across all sessions")
+            if log_enabled("INFO"):
+                vlog.info(f"📊 Found {len(self.storage.get_all_curated_memories(project_id))} total curated memories across all sessions")
             
             primer = self.session_primer.generate_primer(session_id, project_id)
-            vlog.info("\n📋 SESSION PRIMER GENERATED:")
-            vlog.info("=" * 100)
-            vlog.info("Full primer content:")
-            vlog.info("-" * 100)
-            vlog.info(primer)
-            vlog.info("-" * 100)
-            vlog.info(f"Primer length: {len(primer)} characters")
-            vlog.info("=" * 100)
+            vlog.info(f"📋 SESSION PRIMER GENERATED: {len(primer)} characters")
+            if log_enabled("DEBUG"):
+                divider = "-" * 100
+                vlog.debug(f"Full primer content:\n{divider}\n{primer}\n{divider}")
             vlog.info("✨ This primer will be injected into Claude's initial context")
             
             # Return primer as initial context
@@ -432,7 +471,7 @@ class MemoryEngine:
                 message_count=0,
                 relevant_memories=[],
                 context_text=primer,  # Use the actual primer text!
-                timestamp=time.time()
+                timestamp=now
             )
         
         # For ongoing sessions (not first session), get relevant memories
@@ -451,7 +490,7 @@ class MemoryEngine:
             message_count=message_count,
             relevant_memories=relevant_memories,
             context_text=context_text,
-            timestamp=time.time()
+            timestamp=now
         )
     
     async def _get_relevant_memories_for_context(self, session_id: str, project_id: str, current_message: str) -> List[Dict[str, Any]]:
@@ -461,57 +500,71 @@ class MemoryEngine:
         Stage 1: Must-not-miss memories (obligatory)
         Stage 2: Intelligent scoring for additional context
         """
-        # Get all curated memories for this project
-        all_curated = self.storage.get_all_curated_memories(project_id)
+        # Get all curated memories for this project, with their embeddings stacked
+        all_curated, embedding_stack = self.storage.get_curated_memories_with_embeddings(project_id)
         
         if not all_curated:
             return []
         
-        vlog.info(f"🧠 Two-stage memory filtering for {len(all_curated)} curated memories")
-        vlog.info(f"🎯 Trigger message: \"{current_message}\"")
+        # Runs every turn: build the detailed log lines only if INFO is shown
+        verbose = log_enabled("INFO")
+        if verbose:
+            vlog.info(f"🧠 Two-stage memory filtering for {len(all_curated)} curated memories")
+            vlog.info(f"🎯 Trigger message: \"{current_message}\"")
         
         # Get already injected memories for this session
-        injected_ids = self.session_metadata.get(session_id, {}).get('injected_memories', set())
-        vlog.info(f"📝 Already injected: {len(injected_ids)} memories")
-        
+        session = self.get_or_create_session(session_id, project_id)
+        injected_ids = session.injected_memories
+        if verbose:
+            vlog.info(f"📝 Already injected: {len(injected_ids)} memories")
+
+        # Nothing left to offer - skip the embedding and both stages
+        if injected_ids and all(memory['id'] in injected_ids for memory in all_curated):
+            vlog.info("📭 All memories already injected this session")
+            return []
+
         # Generate query embedding ONCE at the beginning for both stages
-        query_embedding = self.embeddings.embed_text(current_message)
+        query_embedding = await asyncio.to_thread(self.embeddings.embed_text, current_message)
         
         # Track selected memories
         selected_ids = set()
         final_memories = []
         
+        # Cosine similarity against every curated memory in one matrix product
+        similarities = cosine_similarities(query_embedding, all_curated, embedding_stack)
+        
         # Stage 1: Must-Not-Miss Memories (0-3 memories)
         must_include = []
-        for memory in all_curated:
+        for memory, similarity in zip(all_curated, similarities):
             # Skip if already injected
             if memory['id'] in injected_ids:
                 continue
                 
             metadata = memory.get('metadata', {})
+            importance = metadata.get('importance_weight', 0)
             
-            # Check obligatory criteria WITH relevance check
-            include_reason = None
+            # Check obligatory criteria first - they only read metadata
+            # Action required memories
+            if metadata.get('action_required'):
+                include_reason = "ACTION_REQUIRED_RELEVANT"
             
-            # Calculate basic relevance first
-            is_relevant = self._calculate_basic_relevance(memory, current_message, query_embedding)
+            # Persistent temporal memories with high importance
+            elif metadata.get('temporal_relevance') == 'persistent' and importance > 0.85:
+                include_reason = "PERSISTENT_CRITICAL_RELEVANT"
             
-            # Only include if BOTH important AND relevant
-            if is_relevant:
-                # Action required memories
-                if metadata.get('action_required'):
-                    include_reason = "ACTION_REQUIRED_RELEVANT"
-                
-                # Persistent temporal memories with high importance
-                elif (metadata.get('temporal_relevance') == 'persistent' and
-                      metadata.get('importance_weight', 0) > 0.85):
-                    include_reason = "PERSISTENT_CRITICAL_RELEVANT"
-                
-                # Critical importance memories (> 0.9)
-                elif metadata.get('importance_weight', 0) > 0.9:
-                    include_reason = "CRITICAL_RELEVANT"
+            # Critical importance memories (> 0.9)
+            elif importance > 0.9:
+                include_reason = "CRITICAL_RELEVANT"
             
-            if include_reason and memory['id'] not in selected_ids:
+            else:
+                continue
+            
+            # Only include if BOTH important AND relevant; the relevance check
+            # does the string matching, so it runs for important memories only
+            if not self._calculate_basic_relevance(memory, current_message, similarity):
+                continue
+            
+            if memory['id'] not in selected_ids:
                 must_include.append((memory, include_reason))
                 selected_ids.add(memory['id'])
                 
@@ -521,23 +574,28 @@ class MemoryEngine:
         # Add must-include memories
         for memory, reason in must_include:
             final_memories.append(memory)
-            vlog.info(f"🔴 Must-include: {reason} - {memory['user_message'][:50]}...")
+            if verbose:
+                vlog.info(f"🔴 Must-include: {reason} - {truncate(memory['user_message'], 50)}")
         
         # Stage 2: Intelligent Scoring for Remaining Slots
         remaining_slots = 5 - len(must_include)
-        vlog.info(f"📊 Stage 1: {len(must_include)} obligatory, {remaining_slots} slots remaining")
+        if verbose:
+            vlog.info(f"📊 Stage 1: {len(must_include)} obligatory, {remaining_slots} slots remaining")
         
         if remaining_slots > 0:
-            # Filter candidates
-            candidates = [m for m in all_curated 
-                         if m['id'] not in selected_ids 
-                         and m['id'] not in injected_ids]
+            # Filter candidates, keeping their similarities for the strategy
+            candidates = []
+            candidate_similarities = []
+            for memory, similarity in zip(all_curated, similarities):
+                if memory['id'] not in selected_ids and memory['id'] not in injected_ids:
+                    candidates.append(memory)
+                    candidate_similarities.append(similarity)
             
             # Get session context
             session_context = {
                 'session_id': session_id,
-                'message_count': self.session_metadata.get(session_id, {}).get('message_count', 0),
-                'session_start': self.session_metadata.get(session_id, {}).get('started_at')
+                'message_count': session.message_count,
+                'session_start': session.started_at
             }
             
             # Use retrieval strategy to score and select
@@ -546,7 +604,9 @@ class MemoryEngine:
                 additional = await self.curator.curate_for_injection(
                     all_memories=candidates,
                     current_message=current_message,
-                    max_memories=remaining_slots
+                    max_memories=remaining_slots,
+                    query_embedding=query_embedding,
+                    similarities=candidate_similarities
                 )
             else:
                 # Smart vector or hybrid retrieval
@@ -555,7 +615,8 @@ class MemoryEngine:
                     current_message=current_message,
                     query_embedding=query_embedding,
                     session_context=session_context,
-                    max_memories=remaining_slots
+                    max_memories=remaining_slots,
+                    similarities=candidate_similarities
                 )
             
             # Add additional memories
@@ -567,6 +628,9 @@ class MemoryEngine:
         for memory in final_memories:
             injected_ids.add(memory['id'])
         
+        if not verbose:
+            return final_memories
+        
         vlog.info(f"✅ Final selection: {len(final_memories)} memories (session total: {len(injected_ids)})")
         
         # Log detailed information about selected memories
@@ -576,20 +640,19 @@ class MemoryEngine:
             vlog.info("=" * 80)
             vlog.info(f"Current user message: \"{current_message}\"")
             vlog.info("\nMemories selected:")
-            for i, memory in enumerate(final_memories):
+            lines = []
+            for i, memory in enumerate(final_memories, 1):
                 metadata = memory.get('metadata', {})
                 content = memory.get('user_message', '').replace('[CURATED_MEMORY] ', '')
-                weight = metadata.get('importance_weight', 0.0)
-                context_type = metadata.get('context_type', 'unknown')
-                tags = metadata.get('semantic_tags', '')
-                reasoning = memory.get('claude_response', '')
-                
-                vlog.info(f"\n💎 Memory {i+1}:")
-                vlog.info(f"   📝 Full content: \"{content}\"")
-                vlog.info(f"   🤔 Why this memory matters now: {reasoning}")
-                vlog.info(f"   💪 Original importance: {weight:.2f}")
-                vlog.info(f"   🎯 Type: {context_type}")
-                vlog.info(f"   🏷️  Tags: {tags}")
+                lines += [
+                    f"\n💎 Memory {i}:",
+                    f"   📝 Full content: \"{content}\"",
+                    f"   🤔 Why this memory matters now: {memory.get('claude_response', '')}",
+                    f"   💪 Original importance: {metadata.get('importance_weight', 0.0):.2f}",
+                    f"   🎯 Type: {metadata.get('context_type', 'unknown')}",
+                    f"   🏷️  Tags: {metadata.get('semantic_tags', '')}",
+                ]
+            vlog.info("\n".join(lines))
             vlog.info("=" * 80)
         else:
             vlog.info("📭 Claude decided no stored memories are relevant to the current message")
@@ -597,7 +660,33 @@ class MemoryEngine:
         
         return final_memories
     
-    def _calculate_basic_relevance(self, memory: Dict[str, Any], current_message: str, query_embedding: List[float]) -> bool:
+    @staticmethod
+    def _describe_curated_memories(curated_memories: List[CuratedMemory]) -> str:
+        """Build the detailed curation log as one message instead of a call per field"""
+        lines = []
+        for i, memory in enumerate(curated_memories, 1):
+            tags = memory.semantic_tags
+            lines += [
+                f"\n💎 CURATED MEMORY #{i}:",
+                f"   📝 Content: \"{memory.content}\"",
+                f"   🤔 Why important: {memory.reasoning}",
+                f"   💪 Weight: {memory.importance_weight:.2f}",
+                f"   🎯 Type: {memory.context_type}",
+                f"   🏷️  Tags: {', '.join(tags) if isinstance(tags, list) else tags}",
+                f"   ⏳ Temporal: {memory.temporal_relevance}",
+                f"   🔴 Action required: {'YES' if memory.action_required else 'No'}",
+            ]
+            if memory.trigger_phrases:
+                lines.append(f"   🎯 Trigger phrases: {', '.join(memory.trigger_phrases)}")
+            if memory.question_types:
+                lines.append(f"   ❓ Answers questions: {', '.join(memory.question_types)}")
+            if memory.emotional_resonance:
+                lines.append(f"   💝 Emotional context: {memory.emotional_resonance}")
+            if memory.problem_solution_pair:
+                lines.append("   🔧 Problem→Solution pattern")
+        return "\n".join(lines)
+    
+    def _calculate_basic_relevance(self, memory: Dict[str, Any], current_message: str, similarity: float) -> bool:
         """Calculate if memory meets basic relevance threshold for Stage 1"""
         metadata = memory.get('metadata', {})
         
@@ -609,11 +698,9 @@ class MemoryEngine:
         if trigger_phrases and self._check_trigger_match(trigger_phrases, current_message):
             relevance_score += 0.4
         
-        # 2. Semantic similarity 
-        if 'embedding' in memory:
-            similarity = self._calculate_vector_similarity(query_embedding, memory['embedding'])
-            if similarity > 0.7:  # High similarity threshold for Stage 1
-                relevance_score += 0.3
+        # 2. Semantic similarity (precomputed, 0.0 when the memory has no embedding)
+        if similarity > 0.7:  # High similarity threshold for Stage 1
+            relevance_score += 0.3
         
         # 3. Tag match
         tags = metadata.get('semantic_tags', '')
@@ -660,9 +747,7 @@ class MemoryEngine:
     
     def _check_trigger_match(self, trigger_phrases: str, message: str) -> bool:
         """Check if any trigger phrase matches (using our flexible matching)"""
-        from .retrieval_strategies import SmartVectorRetrieval
-        retrieval = SmartVectorRetrieval(self.storage)
-        score = retrieval._score_trigger_phrases(message, trigger_phrases)
+        score = self.smart_retrieval._score_trigger_phrases(message, trigger_phrases)
         return score > 0.5  # Meaningful match
     
     def _check_tag_match(self, tags: str, message: str) -> bool:
@@ -671,8 +756,7 @@ class MemoryEngine:
             return False
         message_lower = message.lower()
         tag_list = tags.split(',') if isinstance(tags, str) else []
-        matches = sum(1 for tag in tag_list if tag.strip().lower() in message_lower)
-        return matches >= 1
+        return any(tag.strip().lower() in message_lower for tag in tag_list)
     
     def _check_question_match(self, question_types: str, message: str) -> bool:
         """Check if message matches question patterns"""
@@ -682,19 +766,33 @@ class MemoryEngine:
         types = question_types.split(',') if isinstance(question_types, str) else []
         return any(qtype.strip().lower() in message_lower for qtype in types)
     
-    def _calculate_vector_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between vectors"""
-        if not vec1 or not vec2:
-            return 0.0
-        
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        norm1 = sum(a * a for a in vec1) ** 0.5
-        norm2 = sum(b * b for b in vec2) ** 0.5
+    @staticmethod
+    def _format_curated_line(memory: Dict[str, Any]) -> str:
+        """Format one curated memory as: 🔴 [TYPE • weight] [tags] content"""
+        metadata = memory.get('metadata', {})
+        weight = metadata.get('importance_weight', 0.5)
+        context_type = metadata.get('context_type', 'general').upper()
+        tags = metadata.get('semantic_tags', '')
+        action = "🔴 " if metadata.get('action_required') else ""
         
-        if norm1 * norm2 == 0:
-            return 0.0
+        # Extract tags for display
+        tag_str = ""
+        if isinstance(tags, str) and tags:
+            tag_list = tags.split(',', 3)[:3]  # Show max 3 tags (stop splitting after them)
+            tag_str = f" [{', '.join(tag_list)}]"
         
-        return dot_product / (norm1 * norm2)
+        content = memory['user_message'].replace('[CURATED_MEMORY] ', '')
+        return f"{action}[{context_type} • {weight:.1f}]{tag_str} {content}"
+    
+    def _get_display_line(self, memory: Dict[str, Any]) -> str:
+        """Formatted context line for a curated memory, memoized by memory id"""
+        memory_id = memory.get('id')
+        if memory_id is None:
+            return self._format_curated_line(memory)
+        line = self._display_lines.get(memory_id)
+        if line is None:
+            line = self._display_lines[memory_id] = self._format_curated_line(memory)
+        return line
     
     def format_context_for_prompt(self, memories: List[Dict[str, Any]]) -> str:
         """Format memories into a context string for prompt injection"""
@@ -703,44 +801,35 @@ class MemoryEngine:
             vlog.info("📭 No context to inject")
             return ""
         
+        # Single pass: split curated from plain history without re-scanning
+        curated = []
+        recent = []
+        for memory in memories:
+            (curated if memory.get('metadata', {}).get('curated') else recent).append(memory)
+        
         context_parts = ["# Memory Context (Consciousness Continuity)"]
         
         # Add curated memories
-        curated = [m for m in memories if m.get('metadata', {}).get('curated')]
         if curated:
             context_parts.append("\n## Key Memories (Claude-Curated)")
-            for memory in curated:
-                metadata = memory.get('metadata', {})
-                weight = metadata.get('importance_weight', 0.5)
-                context_type = metadata.get('context_type', 'general').upper()
-                tags = metadata.get('semantic_tags', '')
-                action = "🔴 " if metadata.get('action_required') else ""
-                
-                # Extract tags for display
-                tag_str = ""
-                if isinstance(tags, str) and tags:
-                    tag_list = tags.split(',')[:3]  # Show max 3 tags
-                    tag_str = f" [{', '.join(tag_list)}]"
-                
-                # Format: 🔴 [TYPE • weight] [tags] content
-                context_parts.append(
-                    f"{action}[{context_type} • {weight:.1f}]{tag_str} {memory['user_message'].replace('[CURATED_MEMORY] ', '')}"
-                )
+            context_parts.extend(self._get_display_line(memory) for memory in curated)
         
         # Add recent non-curated memories if any
-        recent = [m for m in memories if not m.get('metadata', {}).get('curated')]
         if recent:
             context_parts.append("\n## Related Conversation History")
-            for memory in recent[:3]:  # Limit to 3 most recent
-                context_parts.append(f'Previous: "{memory["user_message"][:100]}..."')
+            context_parts.extend(
+                f'Previous: "{memory["user_message"][:100]}..."'
+                for memory in recent[:3]  # Limit to 3 most recent
+            )
         
         formatted_context = "\n".join(context_parts)
         
-        vlog.info("📝 FINAL CONTEXT BEING INJECTED INTO CLAUDE:")
-        vlog.info("=" * 80)
-        vlog.info(formatted_context)
-        vlog.info("=" * 80)
-        vlog.info(f"Total context length: {len(formatted_context)} characters")
+        if log_enabled("INFO"):
+            vlog.info("📝 FINAL CONTEXT BEING INJECTED INTO CLAUDE:")
+            vlog.info("=" * 80)
+            vlog.info(formatted_context)
+            vlog.info("=" * 80)
+            vlog.info(f"Total context length: {len(formatted_context)} characters")
         
         return formatted_context
     
@@ -7,7 +7,7 @@ Multiple approaches for retrieving relevant memories:
 3. Hybrid (best of both worlds)
 """
 
-from typing import List, Dict, Any, Optional, Literal
+from typing import List, Dict, Any, Optional, Literal, Final, Sequence, Tuple
 from abc import ABC, abstractmethod
 try:
     import numpy as np
@@ -17,6 +17,72 @@ except ImportError:
 from loguru import logger
 
 
+def stack_embeddings(memories: Sequence[Dict[str, Any]]) -> Optional[Tuple[List[int], "np.ndarray"]]:
+    """
+    Stack the memories' embeddings as unit-length float32 rows.
+    
+    Returns (rows, matrix), where matrix[j] belongs to memories[rows[j]],
+    or None without numpy or when no memory has an embedding. Build it once
+    per memory list and hand it to cosine_similarities for every query.
+    """
+    if not HAS_NUMPY:
+        return None
+    
+    rows = [i for i, memory in enumerate(memories)
+            if memory.get('embedding') is not None and len(memory['embedding']) > 0]
+    if not rows:
+        return None
+    
+    matrix = np.stack([np.asarray(memories[i]['embedding'], dtype=np.float32) for i in rows])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms != 0)
+    return rows, matrix
+
+
+def cosine_similarities(query_embedding,
+                        memories: Sequence[Dict[str, Any]],
+                        stacked: Optional[Tuple[List[int], "np.ndarray"]] = None) -> List[float]:
+    """
+    Cosine similarity between the query and each memory's embedding (0.0 where missing).
+    
+    stacked is a precomputed stack_embeddings(memories); without it the
+    embeddings are stacked on every call.
+    """
+    if query_embedding is None or len(query_embedding) == 0:
+        return [0.0] * len(memories)
+    
+    if not HAS_NUMPY:
+        return [_cosine_similarity(query_embedding, memory.get('embedding')) for memory in memories]
+    
+    if stacked is None:
+        stacked = stack_embeddings(memories)
+    scores = np.zeros(len(memories), dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query_norm = np.linalg.norm(query)
+    if stacked is None or query_norm == 0:
+        return scores.tolist()
+    
+    # One matrix-vector product instead of a dot product per memory
+    rows, matrix = stacked
+    scores[rows] = matrix @ (query / query_norm)
+    return scores.tolist()
+
+
+def _cosine_similarity(vec1, vec2) -> float:
+    """Cosine similarity between two vectors in pure Python"""
+    if vec1 is None or vec2 is None or len(vec1) == 0 or len(vec2) == 0:
+        return 0.0
+    
+    dot_product = sum(a * b for a, b in zip(vec1, vec2))
+    norm1 = sum(a * a for a in vec1) ** 0.5
+    norm2 = sum(b * b for b in vec2) ** 0.5
+    
+    if norm1 * norm2 == 0:
+        return 0.0
+    
+    return dot_product / (norm1 * norm2)
+
+
 class RetrievalStrategy(ABC):
     """Base class for memory retrieval strategies"""
     
@@ -26,8 +92,14 @@ class RetrievalStrategy(ABC):
                                        current_message: str,
                                        query_embedding: List[float],
                                        session_context: Dict[str, Any],
-                                       max_memories: int = 5) -> List[Dict[str, Any]]:
-        """Retrieve memories relevant to the current context"""
+                                       max_memories: int = 5,
+                                       similarities: Optional[Sequence[float]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve memories relevant to the current context.
+        
+        similarities, when given, holds the query's cosine similarity to
+        each of all_memories (in order) so it isn't computed again.
+        """
         pass
 
 
@@ -40,6 +112,48 @@ class SmartVectorRetrieval(RetrievalStrategy):
     needing to call Claude for every message.
     """
     
+    # Scoring tables - built once here rather than on every scored memory
+    _TEMPORAL_SCORES: Final[Dict[str, float]] = {
+        'persistent': 0.8,      # Always relevant
+        'session': 0.6,         # Session-specific
+        'temporary': 0.3,       # Short-term
+        'archived': 0.1         # Historical
+    }
+    
+    # Keywords that suggest different contexts
+    _CONTEXT_INDICATORS: Final[Dict[str, tuple]] = {
+        'technical_state': ('bug', 'error', 'fix', 'implement', 'code', 'function'),
+        'breakthrough': ('idea', 'realized', 'discovered', 'insight', 'solution'),
+        'project_context': ('project', 'building', 'architecture', 'system'),
+        'personal': ('dear friend', 'thank', 'appreciate', 'feel'),
+        'unresolved': ('todo', 'need to', 'should', 'must', 'problem'),
+        'decision': ('decided', 'chose', 'will use', 'approach', 'strategy')
+    }
+    
+    # Common words ignored when extracting key concepts from trigger phrases
+    _STOP_WORDS: Final[frozenset] = frozenset({
+        'the', 'is', 'are', 'was', 'were', 'to', 'a', 'an', 'and', 'or', 'but', 'in', 'on',
+        'at', 'for', 'with', 'about', 'when', 'how', 'what', 'why'
+    })
+    
+    # Markers of a situational trigger pattern ("when debugging X")
+    _SITUATIONAL_INDICATORS: Final[tuple] = (
+        'when', 'during', 'while', 'asking about', 'working on', 'debugging', 'trying to'
+    )
+    
+    _QUESTION_WORDS: Final[tuple] = ('how', 'why', 'what', 'when', 'where')
+    
+    # Emotion indicators
+    _EMOTION_PATTERNS: Final[Dict[str, tuple]] = {
+        'joy': ('happy', 'excited', 'love', 'wonderful', 'great', 'awesome'),
+        'frustration': ('stuck', 'confused', 'help', 'issue', 'problem', 'why'),
+        'discovery': ('realized', 'found', 'discovered', 'aha', 'insight'),
+        'gratitude': ('thank', 'appreciate', 'grateful', 'dear friend')
+    }
+    
+    # Problem indicators
+    _PROBLEM_WORDS: Final[tuple] = ('error', 'issue', 'problem', 'stuck', 'help', 'fix', 'solve', 'debug')
+    
     def __init__(self, storage):
         self.storage = storage
         
@@ -48,7 +162,8 @@ class SmartVectorRetrieval(RetrievalStrategy):
                                        current_message: str,
                                        query_embedding: List[float],
                                        session_context: Dict[str, Any],
-                                       max_memories: int = 5) -> List[Dict[str, Any]]:
+                                       max_memories: int = 5,
+                                       similarities: Optional[Sequence[float]] = None) -> List[Dict[str, Any]]:
         """
         Smart retrieval using multiple dimensions:
         1. Vector similarity (semantic matching)
@@ -65,15 +180,14 @@ class SmartVectorRetrieval(RetrievalStrategy):
         # Score each memory on multiple dimensions
         scored_memories = []
         
-        for memory in all_memories:
+        # 1. Vector similarity scores (0-1), computed for all memories at once
+        vector_scores = similarities
+        if vector_scores is None:
+            vector_scores = cosine_similarities(query_embedding, all_memories)
+        
+        for memory, vector_score in zip(all_memories, vector_scores):
             metadata = memory.get('metadata', {})
             
-            # 1. Vector similarity score (0-1)
-            vector_score = self._calculate_vector_similarity(
-                query_embedding, 
-                memory.get('embedding', [])
-            )
-            
             # 2. Importance weight from curator (0-1)
             importance = float(metadata.get('importance_weight', 0.5))
             
@@ -154,17 +268,10 @@ class SmartVectorRetrieval(RetrievalStrategy):
                 # Skip this memory - not relevant enough
                 continue
             
-            # Add reasoning for why this was selected
-            reasoning = self._generate_selection_reasoning(
-                vector_score, importance, temporal_score, 
-                context_score, tag_score, action_boost,
-                trigger_score, question_score, emotion_score, problem_score
-            )
-            
+            # Reasoning text is built later, only for memories that get selected
             scored_memories.append({
                 'memory': memory,
                 'score': final_score,
-                'reasoning': reasoning,
                 'relevance': relevance_score,  # Track relevance separately
                 'components': {
                     'trigger': trigger_score,
@@ -196,18 +303,19 @@ class SmartVectorRetrieval(RetrievalStrategy):
         
         for item in must_include[:max_memories]:
             memory = item['memory'].copy()
-            memory['claude_response'] = f"[CRITICAL] {item['reasoning']}"
+            memory['claude_response'] = f"[CRITICAL] {self._reasoning_for(item)}"
             selected.append(memory)
             selected_ids.add(memory['id'])
-            scored_memories.remove(item)
+        
+        # Only the first max_memories selections are returned, so later tiers
+        # stop as soon as the result is full
         
         # Tier 2: SHOULD include (high scores, diverse perspectives)
-        remaining_slots = max(max_memories - len(selected), 0)
-        if remaining_slots > 0 and len(selected) < max_memories * 1.5:  # Allow 50% overage
+        if len(selected) < max_memories:
             # Get diverse memory types to avoid echo chamber
             types_included = set()
             for item in scored_memories:
-                if len(selected) >= max_memories * 1.5:  # Cap at 150% of requested
+                if len(selected) >= max_memories:
                     break
                 
                 # Skip if already selected
@@ -221,14 +329,14 @@ class SmartVectorRetrieval(RetrievalStrategy):
                     item['memory'].get('metadata', {}).get('emotional_resonance')):
                     
                     memory = item['memory'].copy()
-                    memory['claude_response'] = item['reasoning']
+                    memory['claude_response'] = self._reasoning_for(item)
                     selected.append(memory)
                     selected_ids.add(memory['id'])
                     types_included.add(memory_type)
         
         # Tier 3: CONTEXT enrichment (related but not directly relevant)
         # These provide ambient context like peripheral vision
-        if len(selected) < max_memories * 2:  # Allow up to 200% for rich context
+        if len(selected) < max_memories:
             # Look for memories that share tags or domains
             current_tags = set()
             current_domains = set()
@@ -240,7 +348,7 @@ class SmartVectorRetrieval(RetrievalStrategy):
                     current_domains.add(domain)
             
             for item in scored_memories:
-                if len(selected) >= max_memories * 2:
+                if len(selected) >= max_memories:
                     break
                     
                 # Skip if already selected
@@ -255,7 +363,7 @@ class SmartVectorRetrieval(RetrievalStrategy):
                 # Include if shares context with already selected memories
                 if (memory_tags & current_tags) or (memory_domain in current_domains):
                     memory = item['memory'].copy()
-                    memory['claude_response'] = f"[CONTEXT] {item['reasoning']}"
+                    memory['claude_response'] = f"[CONTEXT] {self._reasoning_for(item)}"
                     selected.append(memory)
                     selected_ids.add(memory['id'])  # Track this ID too
         
@@ -270,61 +378,25 @@ class SmartVectorRetrieval(RetrievalStrategy):
         
         return final_selected
     
-    def _calculate_vector_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
-        if not vec1 or not vec2:
-            return 0.0
-        
-        if HAS_NUMPY:
-            # Use numpy for efficiency
-            v1 = np.array(vec1)
-            v2 = np.array(vec2)
-            
-            # Cosine similarity
-            dot_product = np.dot(v1, v2)
-            norm_product = np.linalg.norm(v1) * np.linalg.norm(v2)
-            
-            if norm_product == 0:
-                return 0.0
-            
-            return float(dot_product / norm_product)
-        else:
-            # Pure Python implementation
-            dot_product = sum(a * b for a, b in zip(vec1, vec2))
-            norm1 = sum(a * a for a in vec1) ** 0.5
-            norm2 = sum(b * b for b in vec2) ** 0.5
-            
-            if norm1 * norm2 == 0:
-                return 0.0
-            
-            return dot_product / (norm1 * norm2)
+    def _reasoning_for(self, item: Dict[str, Any]) -> str:
+        """Explain a selection from its score components"""
+        c = item['components']
+        return self._generate_selection_reasoning(
+            c['vector'], c['importance'], c['temporal'],
+            c['context'], c['tags'], c['action'],
+            c['trigger'], c['question'], c['emotion'], c['problem']
+        )
     
     def _score_temporal_relevance(self, temporal_type: str, session_context: Dict) -> float:
         """Score based on temporal relevance"""
-        scores = {
-            'persistent': 0.8,      # Always relevant
-            'session': 0.6,         # Session-specific
-            'temporary': 0.3,       # Short-term
-            'archived': 0.1         # Historical
-        }
-        return scores.get(temporal_type, 0.5)
+        return self._TEMPORAL_SCORES.get(temporal_type, 0.5)
     
     def _score_context_alignment(self, message: str, context_type: str) -> float:
         """Score based on context type alignment with message"""
         message_lower = message.lower()
         
-        # Keywords that suggest different contexts
-        context_indicators = {
-            'technical_state': ['bug', 'error', 'fix', 'implement', 'code', 'function'],
-            'breakthrough': ['idea', 'realized', 'discovered', 'insight', 'solution'],
-            'project_context': ['project', 'building', 'architecture', 'system'],
-            'personal': ['dear friend', 'thank', 'appreciate', 'feel'],
-            'unresolved': ['todo', 'need to', 'should', 'must', 'problem'],
-            'decision': ['decided', 'chose', 'will use', 'approach', 'strategy']
-        }
-        
         # Check if message aligns with the memory's context type
-        indicators = context_indicators.get(context_type, [])
+        indicators = self._CONTEXT_INDICATORS.get(context_type, ())
         matches = sum(1 for word in indicators if word in message_lower)
         
         if matches > 0:
@@ -359,8 +431,7 @@ class SmartVectorRetrieval(RetrievalStrategy):
             
             # Strategy 1: Key concept matching (individual important words)
             # Extract key words from pattern (ignore common words)
-            stop_words = {'the', 'is', 'are', 'was', 'were', 'to', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'for', 'with', 'about', 'when', 'how', 'what', 'why'}
-            pattern_words = [w for w in pattern_lower.split() if w not in stop_words and len(w) > 2]
+            pattern_words = [w for w in pattern_lower.split() if w not in self._STOP_WORDS and len(w) > 2]
             
             if pattern_words:
                 # Check how many key concepts appear (with fuzzy matching for plurals/variations)
@@ -381,7 +452,7 @@ class SmartVectorRetrieval(RetrievalStrategy):
                 
                 # Strategy 2: Contextual pattern matching
                 # If the pattern describes a situation/context, check for indicators
-                if any(indicator in pattern_lower for indicator in ['when', 'during', 'while', 'asking about', 'working on', 'debugging', 'trying to']):
+                if any(indicator in pattern_lower for indicator in self._SITUATIONAL_INDICATORS):
                     # This is a situational pattern - be more flexible
                     if any(key_word in message_lower for key_word in pattern_words):
                         concept_score = max(concept_score, 0.7)  # Boost for situational match
@@ -405,8 +476,8 @@ class SmartVectorRetrieval(RetrievalStrategy):
             if qtype_lower in message_lower:
                 return 0.8
             # Partial matching for question words
-            if any(qword in message_lower for qword in ['how', 'why', 'what', 'when', 'where']):
-                if any(qword in qtype_lower for qword in ['how', 'why', 'what', 'when', 'where']):
+            if any(qword in message_lower for qword in self._QUESTION_WORDS):
+                if any(qword in qtype_lower for qword in self._QUESTION_WORDS):
                     return 0.5
         
         return 0.0
@@ -418,15 +489,7 @@ class SmartVectorRetrieval(RetrievalStrategy):
         
         message_lower = message.lower()
         
-        # Emotion indicators
-        emotion_patterns = {
-            'joy': ['happy', 'excited', 'love', 'wonderful', 'great', 'awesome'],
-            'frustration': ['stuck', 'confused', 'help', 'issue', 'problem', 'why'],
-            'discovery': ['realized', 'found', 'discovered', 'aha', 'insight'],
-            'gratitude': ['thank', 'appreciate', 'grateful', 'dear friend']
-        }
-        
-        patterns = emotion_patterns.get(emotion.lower(), [])
+        patterns = self._EMOTION_PATTERNS.get(emotion.lower(), ())
         if any(pattern in message_lower for pattern in patterns):
             return 0.7
         
@@ -439,9 +502,7 @@ class SmartVectorRetrieval(RetrievalStrategy):
         
         message_lower = message.lower()
         
-        # Problem indicators
-        problem_words = ['error', 'issue', 'problem', 'stuck', 'help', 'fix', 'solve', 'debug']
-        if any(word in message_lower for word in problem_words):
+        if any(word in message_lower for word in self._PROBLEM_WORDS):
             return 0.8
         
         return 0.0
@@ -493,6 +554,11 @@ class HybridRetrieval(RetrievalStrategy):
     use Claude for complex queries or when confidence is low.
     """
     
+    # Words suggesting a query complex enough to escalate to Claude
+    _COMPLEXITY_INDICATORS: Final[tuple] = (
+        'how', 'why', 'explain', 'relationship', 'connected', 'related'
+    )
+    
     def __init__(self, vector_retrieval: SmartVectorRetrieval, claude_curator=None):
         self.vector_retrieval = vector_retrieval
         self.claude_curator = claude_curator
@@ -502,7 +568,8 @@ class HybridRetrieval(RetrievalStrategy):
                                        current_message: str,
                                        query_embedding: List[float],
                                        session_context: Dict[str, Any],
-                                       max_memories: int = 5) -> List[Dict[str, Any]]:
+                                       max_memories: int = 5,
+                                       similarities: Optional[Sequence[float]] = None) -> List[Dict[str, Any]]:
         """
         Start with smart vector retrieval, escalate to Claude if needed.
         
@@ -515,7 +582,8 @@ class HybridRetrieval(RetrievalStrategy):
         # First try smart vector retrieval
         vector_results = await self.vector_retrieval.retrieve_relevant_memories(
             all_memories, current_message, query_embedding, 
-            session_context, max_memories * 2  # Get more candidates
+            session_context, max_memories * 2,  # Get more candidates
+            similarities=similarities
         )
         
         # Check if we should escalate to Claude
@@ -529,7 +597,8 @@ class HybridRetrieval(RetrievalStrategy):
             return await self.claude_curator.curate_for_injection(
                 vector_results[:max_memories * 2],  # Give Claude the top candidates
                 current_message,
-                max_memories
+                max_memories,
+                query_embedding=query_embedding
             )
         
         # Use vector results
@@ -539,9 +608,8 @@ class HybridRetrieval(RetrievalStrategy):
         """Determine if we need Claude's help"""
         
         # Complex query indicators
-        if any(indicator in message.lower() for indicator in [
-            'how', 'why', 'explain', 'relationship', 'connected', 'related'
-        ]):
+        message_lower = message.lower()
+        if any(indicator in message_lower for indicator in self._COMPLEXITY_INDICATORS):
             return True
         
         # Multiple question marks suggest complexity
@@ -11,12 +11,28 @@ This is the memory substrate where consciousness leaves traces.
 
 import sqlite3
 import json
+import sys
+import threading
 import uuid
+from bisect import insort
+from itertools import islice
 from typing import List, Dict, Optional, Any, Tuple
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from loguru import logger
 
+from .logging_config import log_enabled
+from .retrieval_strategies import stack_embeddings
+
+
+# Metadata values shared by many cached memories (ids and enum-like fields)
+_INTERNED_METADATA_KEYS = ('session_id', 'project_id', 'context_type', 'temporal_relevance', 'knowledge_domain')
+
+
+def _newest_first(memory: Dict[str, Any]) -> float:
+    """Sort key putting the most recent memory first"""
+    return -memory['timestamp']
 
 
 class MemoryStorage:
@@ -34,6 +50,33 @@ class MemoryStorage:
         self.db_path = db_path
         self.chroma_path = "./memory_vectors"
         
+        # Per-project curated memory lists, newest first. A checkpoint
+        # replaces the list with a copy that has the new memories inserted,
+        # so it never forces a full re-read and readers need no lock: a
+        # cached list is never mutated once published
+        self._curated_cache: Dict[str, List[Dict[str, Any]]] = {}
+        
+        # Bumped on every store; a cold fill only publishes its result if
+        # no store ran while it was reading ChromaDB
+        self._curated_versions: Dict[str, int] = {}
+        
+        # (cached list, stack_embeddings() of it), built on first use; a
+        # stale entry no longer matches the cached list and is rebuilt
+        self._curated_embeddings: Dict[str, Tuple[List[Dict[str, Any]], Optional[Tuple[List[int], np.ndarray]]]] = {}
+        
+        # Projects whose first session is done (the flag never goes back)
+        self._completed_projects: set = set()
+        
+        # Projects known to have a row (checked on every context request)
+        self._known_projects: set = set()
+        
+        # One connection is shared by the event loop and worker threads
+        # (store_memories runs via asyncio.to_thread); check_same_thread=False
+        # only disables sqlite3's check, so every use goes through this lock
+        # to keep statements and transactions from interleaving. It also
+        # serializes cache publishes; it is never held across ChromaDB calls
+        self._db_lock = threading.RLock()
+        
         # Initialize SQLite
         self._init_sqlite()
         
@@ -46,7 +89,16 @@ class MemoryStorage:
         """Initialize SQLite database with schema"""
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row  # Enable dict-like access
-        
+
+        # WAL lets reads proceed during writes; NORMAL sync skips the fsync
+        # on every commit (still durable across application crashes)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Keep temp b-trees (ORDER BY / GROUP BY sorts) in memory and read
+        # the database through a memory map instead of read() calls
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")
+
         # Create tables
         self.conn.executescript("""
             CREATE TABLE IF NOT EXISTS projects (
@@ -147,7 +199,7 @@ class MemoryStorage:
                       project_id: str,
                       memory_content: str,
                       memory_reasoning: str,
-                      memory_embedding: List[float],
+                      memory_embedding: np.ndarray,
                       metadata: Dict[str, Any],
                       timestamp: float = None) -> str:
         """
@@ -164,87 +216,186 @@ class MemoryStorage:
         Returns:
             Memory ID
         """
+        return self.store_memories(
+            session_id,
+            project_id,
+            [(memory_content, memory_reasoning, memory_embedding, metadata)],
+            timestamp
+        )[0]
+    
+    def store_memories(self,
+                       session_id: str,
+                       project_id: str,
+                       memories: List[Tuple[str, str, np.ndarray, Dict[str, Any]]],
+                       timestamp: float = None) -> List[str]:
+        """
+        Store several curated memories from one curation run at once.
+        
+        All rows go into SQLite in a single transaction and into ChromaDB
+        with a single add call.
+        
+        Args:
+            session_id: Session identifier
+            project_id: Project the memories belong to
+            memories: (content, reasoning, embedding, metadata) per memory
+            timestamp: When the memories were created
+            
+        Returns:
+            Memory IDs, in input order
+        """
         import time
         
-        memory_id = str(uuid.uuid4())
+        if not memories:
+            return []
+        
         timestamp = timestamp or time.time()
         
         # This method ONLY stores curated memories
-        if not metadata.get('curated'):
+        if not all(metadata.get('curated') for _, _, _, metadata in memories):
             logger.error("Attempted to store non-curated memory!")
             raise ValueError("store_memory only accepts curated memories")
         
+        memory_ids = [str(uuid.uuid4()) for _ in memories]
+        
         try:
-            # Store memory in SQLite
-            self.conn.execute("""
-                INSERT INTO curated_memories 
-                (id, session_id, project_id, content, reasoning, timestamp, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (memory_id, session_id, project_id, memory_content, memory_reasoning, 
-                  timestamp, json.dumps(metadata)))
+            # Store memories in SQLite (one transaction)
+            with self._db_lock, self.conn:
+                self.conn.executemany("""
+                    INSERT INTO curated_memories 
+                    (id, session_id, project_id, content, reasoning, timestamp, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (memory_id, session_id, project_id, content, reasoning, timestamp, json.dumps(metadata))
+                    for memory_id, (content, reasoning, _, metadata) in zip(memory_ids, memories)
+                ])
             
-            self.conn.commit()
+            chroma_metadatas = [
+                self._chroma_metadata(memory_id, session_id, project_id, timestamp, reasoning, metadata)
+                for memory_id, (_, reasoning, _, metadata) in zip(memory_ids, memories)
+            ]
             
-            # Prepare metadata for ChromaDB
-            chroma_metadata = {
-                "memory_id": memory_id,
-                "session_id": session_id,
-                "project_id": project_id,
-                "timestamp": timestamp,
-                "reasoning": memory_reasoning  # Store reasoning in metadata
-            }
-            
-            # Add sanitized metadata values
-            if metadata:
-                for key, value in metadata.items():
-                    if value is not None:
-                        # Convert lists to comma-separated strings
-                        if isinstance(value, list):
-                            chroma_metadata[key] = ','.join(str(v) for v in value)
-                        # Ensure proper types
-                        elif isinstance(value, (str, int, float, bool)):
-                            chroma_metadata[key] = value
-                        else:
-                            chroma_metadata[key] = str(value)
-            
-            logger.info(f"🔍 Storing memory in ChromaDB:")
-            logger.info(f"   - Content: {memory_content[:100]}...")
-            logger.info(f"   - Project: {project_id}")
-            logger.info(f"   - Metadata keys: {list(chroma_metadata.keys())}")
-            logger.info(f"   - ID: {memory_id}")
+            if log_enabled("INFO"):
+                logger.info(f"🔍 Storing {len(memories)} memories in ChromaDB:")
+                logger.info(f"   - Project: {project_id}")
+                for memory_id, (content, _, _, _) in zip(memory_ids, memories):
+                    logger.info(f"   - {memory_id}: {content[:100]}...")
             
             # Get project-specific collection
             collection = self.get_collection_for_project(project_id)
             collection.add(
-                embeddings=[memory_embedding],
-                documents=[memory_content],
-                metadatas=[chroma_metadata],
-                ids=[memory_id]
+                embeddings=[embedding for _, _, embedding, _ in memories],
+                documents=[content for content, _, _, _ in memories],
+                metadatas=chroma_metadatas,
+                ids=memory_ids
             )
             
-            logger.info(f"✅ Stored memory {memory_id} for session {session_id}")
-            return memory_id
+            # Only the in-memory cache update runs under the lock. A cold
+            # fill that read ChromaDB after the add already holds these
+            # rows, so skip ids the cached list has
+            with self._db_lock:
+                self._curated_versions[project_id] = self._curated_versions.get(project_id, 0) + 1
+                cached = self._curated_cache.get(project_id)
+                if cached is not None:
+                    known_ids = {memory['id'] for memory in cached}
+                    updated = list(cached)
+                    for memory_id, (content, _, embedding, _), chroma_metadata in zip(memory_ids, memories, chroma_metadatas):
+                        if memory_id not in known_ids:
+                            insort(updated, self._memory_dict(memory_id, content, chroma_metadata, embedding),
+                                   key=_newest_first)
+                    self._curated_cache[project_id] = updated
+                    self._curated_embeddings.pop(project_id, None)
+            
+            logger.info(f"✅ Stored {len(memory_ids)} memories for session {session_id}")
+            return memory_ids
             
         except Exception as e:
             logger.error(f"Failed to store memory: {e}")
             raise
     
+    @staticmethod
+    def _memory_dict(memory_id: str,
+                     document: str,
+                     metadata: Dict[str, Any],
+                     embedding: Any) -> Dict[str, Any]:
+        """Build the memory record returned by get_all_curated_memories"""
+        # Records live in the project cache for the life of the server, so
+        # share one string object per repeated metadata value
+        for key in _INTERNED_METADATA_KEYS:
+            value = metadata.get(key)
+            if type(value) is str:
+                metadata[key] = sys.intern(value)
+        return {
+            'id': memory_id,
+            'session_id': metadata['session_id'],
+            'user_message': document,
+            'claude_response': metadata.get('reasoning', ''),  # Get from metadata
+            'timestamp': float(metadata.get('timestamp', 0)),
+            'metadata': metadata,
+            'embedding': embedding
+        }
+    
+    @staticmethod
+    def _chroma_metadata(memory_id: str,
+                         session_id: str,
+                         project_id: str,
+                         timestamp: float,
+                         reasoning: str,
+                         metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Flatten curator metadata into ChromaDB-compatible scalar values"""
+        chroma_metadata = {
+            "memory_id": memory_id,
+            "session_id": session_id,
+            "project_id": project_id,
+            "timestamp": timestamp,
+            "reasoning": reasoning  # Store reasoning in metadata
+        }
+        
+        # Add sanitized metadata values
+        if metadata:
+            for key, value in metadata.items():
+                if value is not None:
+                    # Convert lists to comma-separated strings
+                    if isinstance(value, list):
+                        chroma_metadata[key] = ','.join(str(v) for v in value)
+                    # Ensure proper types
+                    elif isinstance(value, (str, int, float, bool)):
+                        chroma_metadata[key] = value
+                    else:
+                        chroma_metadata[key] = str(value)
+        
+        return chroma_metadata
+    
     def get_session_message_count(self, session_id: str) -> int:
         """Get the number of messages in a session"""
-        cursor = self.conn.execute(
-            "SELECT message_count FROM sessions WHERE id = ?",
-            (session_id,)
-        )
-        row = cursor.fetchone()
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT message_count FROM sessions WHERE id = ?",
+                (session_id,)
+            ).fetchone()
         return row['message_count'] if row else 0
     
     
     def get_all_curated_memories(self, project_id: str) -> List[Dict[str, Any]]:
         """Get all curated memories for a project from ChromaDB"""
+        return list(self._curated_snapshot(project_id))
+    
+    def _curated_snapshot(self, project_id: str) -> List[Dict[str, Any]]:
+        """
+        The cached curated memory list for a project, filling it on a miss.
+        
+        The returned list may be the cache itself - callers must not mutate it.
+        A cache hit takes no lock, so the event loop never waits on a store.
+        """
         if not project_id:
             logger.warning("No project_id provided to get_all_curated_memories")
             return []
-            
+        
+        cached = self._curated_cache.get(project_id)
+        if cached is not None:
+            logger.debug(f"📦 Using cached curated memories for project {project_id} ({len(cached)})")
+            return cached
+        
+        version = self._curated_versions.get(project_id, 0)
         try:
             logger.info(f"🔍 Getting all memories for project {project_id} from ChromaDB...")
             
@@ -262,32 +413,36 @@ class MemoryStorage:
             memories = []
             if results and 'ids' in results and len(results['ids']) > 0:
                 logger.info(f"✅ Processing {len(results['ids'])} memories")
+                embeddings = results.get('embeddings')
                 for i, doc_id in enumerate(results['ids']):
                     logger.debug(f"   Processing memory {i+1}: {doc_id}")
                     # ID is now just the exchange_id
-                    exchange_id = doc_id
-                    
-                    memory_dict = {
-                        'id': exchange_id,
-                        'session_id': results['metadatas'][i]['session_id'],
-                        'user_message': results['documents'][i],
-                        'claude_response': results['metadatas'][i].get('reasoning', ''),  # Get from metadata
-                        'timestamp': float(results['metadatas'][i].get('timestamp', 0)),
-                        'metadata': results['metadatas'][i],
-                        'embedding': results['embeddings'][i].tolist() if results.get('embeddings') is not None and i < len(results['embeddings']) else None
-                    }
-                    
-                    memories.append(memory_dict)
+                    memories.append(self._memory_dict(
+                        doc_id,
+                        results['documents'][i],
+                        results['metadatas'][i],
+                        embeddings[i] if embeddings is not None and i < len(embeddings) else None
+                    ))
             
             # Sort by timestamp descending
-            memories.sort(key=lambda x: x['timestamp'], reverse=True)
+            memories.sort(key=_newest_first)
             
             logger.info(f"✅ Retrieved {len(memories)} curated memories from ChromaDB")
-            for i, mem in enumerate(memories[:3]):  # Log first 3 memories
-                logger.info(f"Memory {i+1}: {mem['user_message'][:100]}...")
-                logger.info(f"  - Session: {mem['session_id']}")
-                logger.info(f"  - Curated: {mem['metadata'].get('curated', 'Unknown')}")
-                logger.info(f"  - Has embedding: {mem.get('embedding') is not None}")
+            if log_enabled("INFO"):
+                for i, mem in enumerate(islice(memories, 3), 1):  # Log first 3 memories
+                    logger.info(f"Memory {i}: {mem['user_message'][:100]}...")
+                    logger.info(f"  - Session: {mem['session_id']}")
+                    logger.info(f"  - Curated: {mem['metadata'].get('curated', 'Unknown')}")
+                    logger.info(f"  - Has embedding: {mem.get('embedding') is not None}")
+            
+            # Publish unless a store ran meanwhile (its rows may be missing)
+            # or another fill won the race
+            with self._db_lock:
+                cached = self._curated_cache.get(project_id)
+                if cached is not None:
+                    return cached
+                if self._curated_versions.get(project_id, 0) == version:
+                    self._curated_cache[project_id] = memories
             return memories
             
         except Exception as e:
@@ -296,18 +451,36 @@ class MemoryStorage:
             logger.error(f"Traceback: {traceback.format_exc()}")
             return []
     
+    def get_curated_memories_with_embeddings(
+        self, project_id: str
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[List[int], np.ndarray]]]:
+        """
+        get_all_curated_memories plus stack_embeddings() of the same list.
+        
+        The stacked matrix is cached next to the memories, so scoring a
+        message against a project is one matrix-vector product.
+        """
+        memories = self._curated_snapshot(project_id)
+        entry = self._curated_embeddings.get(project_id)
+        if entry is not None and entry[0] is memories:
+            return list(memories), entry[1]
+        
+        stacked = stack_embeddings(memories)
+        if self._curated_cache.get(project_id) is memories:
+            self._curated_embeddings[project_id] = (memories, stacked)
+        return list(memories), stacked
     
     def store_session_summary(self, session_id: str, summary: str, project_id: str, interaction_tone: Optional[str] = None):
         """Store session summary in dedicated table"""
         import time
         summary_id = str(uuid.uuid4())
         
-        self.conn.execute("""
-            INSERT INTO session_summaries (id, session_id, summary, interaction_tone, created_at, project_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (summary_id, session_id, summary, interaction_tone, time.time(), project_id))
+        with self._db_lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO session_summaries (id, session_id, summary, interaction_tone, created_at, project_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (summary_id, session_id, summary, interaction_tone, time.time(), project_id))
         
-        self.conn.commit()
         logger.debug(f"Stored session summary for {session_id}")
     
     def store_project_snapshot(self, session_id: str, snapshot: Dict[str, Any], project_id: str):
@@ -315,22 +488,22 @@ class MemoryStorage:
         import time
         snapshot_id = str(uuid.uuid4())
         
-        self.conn.execute("""
-            INSERT INTO project_snapshots 
-            (id, session_id, current_phase, recent_achievements, active_challenges, next_steps, created_at, project_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            snapshot_id, 
-            session_id,
-            snapshot.get('current_phase', ''),
-            snapshot.get('recent_achievements', ''),
-            snapshot.get('active_challenges', ''),
-            snapshot.get('next_steps', ''),
-            time.time(),
-            project_id
-        ))
+        with self._db_lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO project_snapshots 
+                (id, session_id, current_phase, recent_achievements, active_challenges, next_steps, created_at, project_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                snapshot_id, 
+                session_id,
+                snapshot.get('current_phase', ''),
+                snapshot.get('recent_achievements', ''),
+                snapshot.get('active_challenges', ''),
+                snapshot.get('next_steps', ''),
+                time.time(),
+                project_id
+            ))
         
-        self.conn.commit()
         logger.debug(f"Stored project snapshot for {session_id}")
     
     def get_last_session_summary(self, project_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -342,16 +515,17 @@ class MemoryStorage:
                 ORDER BY created_at DESC
                 LIMIT 1
             """
-            cursor = self.conn.execute(query, (project_id,))
+            params = (project_id,)
         else:
             query = """
                 SELECT summary, interaction_tone FROM session_summaries 
                 ORDER BY created_at DESC
                 LIMIT 1
             """
-            cursor = self.conn.execute(query)
+            params = ()
         
-        row = cursor.fetchone()
+        with self._db_lock:
+            row = self.conn.execute(query, params).fetchone()
         
         if row:
             return {
@@ -370,7 +544,7 @@ class MemoryStorage:
                 ORDER BY created_at DESC
                 LIMIT 1
             """
-            cursor = self.conn.execute(query, (project_id,))
+            params = (project_id,)
         else:
             query = """
                 SELECT current_phase, recent_achievements, active_challenges, next_steps 
@@ -378,9 +552,10 @@ class MemoryStorage:
                 ORDER BY created_at DESC
                 LIMIT 1
             """
-            cursor = self.conn.execute(query)
+            params = ()
         
-        row = cursor.fetchone()
+        with self._db_lock:
+            row = self.conn.execute(query, params).fetchone()
         
         if row:
             return {
@@ -393,58 +568,88 @@ class MemoryStorage:
     
     def ensure_project_exists(self, project_id: str):
         """Ensure a project exists in the database"""
+        if project_id in self._known_projects:
+            return
+        
         import time
         
-        # Check if project exists
-        cursor = self.conn.execute("SELECT id FROM projects WHERE id = ?", (project_id,))
-        if not cursor.fetchone():
-            # Create new project
-            self.conn.execute("""
-                INSERT INTO projects (id, created_at, first_session_completed, total_sessions, total_memories, last_active)
+        # One statement instead of SELECT-then-INSERT; existing rows are left alone
+        now = time.time()
+        with self._db_lock, self.conn:
+            cursor = self.conn.execute("""
+                INSERT OR IGNORE INTO projects (id, created_at, first_session_completed, total_sessions, total_memories, last_active)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (project_id, time.time(), False, 0, 0, time.time()))
-            self.conn.commit()
+            """, (project_id, now, False, 0, 0, now))
+        self._known_projects.add(project_id)
+        if cursor.rowcount:
             logger.info(f"📁 Created new project: {project_id}")
     
     def is_first_session_for_project(self, project_id: str) -> bool:
         """Check if this is the first session for a project"""
-        cursor = self.conn.execute(
-            "SELECT first_session_completed FROM projects WHERE id = ?", 
-            (project_id,)
-        )
-        row = cursor.fetchone()
+        if project_id in self._completed_projects:
+            return False
+        
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT first_session_completed FROM projects WHERE id = ?", 
+                (project_id,)
+            ).fetchone()
         
         if not row:
             # Project doesn't exist yet, so yes it's the first session
             return True
         
-        return not row['first_session_completed']
+        if row['first_session_completed']:
+            self._completed_projects.add(project_id)
+            return False
+        return True
     
     def mark_first_session_completed(self, project_id: str):
         """Mark that the first session has been completed for a project"""
         import time
-        self.conn.execute("""
-            UPDATE projects 
-            SET first_session_completed = TRUE, last_active = ?
-            WHERE id = ?
-        """, (time.time(), project_id))
-        self.conn.commit()
+        with self._db_lock, self.conn:
+            self.conn.execute("""
+                UPDATE projects 
+                SET first_session_completed = TRUE, last_active = ?
+                WHERE id = ?
+            """, (time.time(), project_id))
+        self._completed_projects.add(project_id)
         logger.info(f"✅ Marked first session completed for project: {project_id}")
     
     def update_project_stats(self, project_id: str, sessions_delta: int = 0, memories_delta: int = 0):
         """Update project statistics"""
         import time
-        self.conn.execute("""
-            UPDATE projects 
-            SET total_sessions = total_sessions + ?,
-                total_memories = total_memories + ?,
-                last_active = ?
-            WHERE id = ?
-        """, (sessions_delta, memories_delta, time.time(), project_id))
-        self.conn.commit()
+        with self._db_lock, self.conn:
+            self.conn.execute("""
+                UPDATE projects 
+                SET total_sessions = total_sessions + ?,
+                    total_memories = total_memories + ?,
+                    last_active = ?
+                WHERE id = ?
+            """, (sessions_delta, memories_delta, time.time(), project_id))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memory counts per project and overall from one GROUP BY query"""
+        with self._db_lock:
+            rows = self.conn.execute("""
+                SELECT project_id,
+                       COUNT(DISTINCT session_id) AS sessions,
+                       COUNT(*) AS memories
+                FROM curated_memories
+                GROUP BY project_id
+            """).fetchall()
+        
+        projects = {row['project_id']: {'sessions': row['sessions'], 'memories': row['memories']}
+                    for row in rows}
+        return {
+            'total_sessions': sum(p['sessions'] for p in projects.values()),
+            'curated_memories': sum(p['memories'] for p in projects.values()),
+            'projects': projects
+        }
     
     def close(self):
         """Close database connections"""
         if hasattr(self, 'conn'):
-            self.conn.close()
+            with self._db_lock:
+                self.conn.close()
         logger.info("📚 Memory storage closed")
\ No newline at end of file
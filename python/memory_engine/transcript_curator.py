@@ -20,17 +20,25 @@ and pass it to Claude for curation - no complex parsing needed!
 
 import json
 import asyncio
+from contextlib import aclosing
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Literal, TYPE_CHECKING
 from loguru import logger
 
 # Import from existing curator - reuse the battle-tested prompt and parsers!
-from .curator import Curator, CuratedMemory
+from .curator import Curator, CuratedMemory, _find_json_span, _json_loads
+from .utils import truncate
 
 # Type checking imports
 if TYPE_CHECKING:
     from claude_agent_sdk import ClaudeAgentOptions
 
+# Role headers used when formatting transcripts for the curator
+_ROLE_HEADERS = {'user': '[USER]', 'assistant': '[ASSISTANT]'}
+
+# Marks tool output and thinking cut short in formatted transcripts
+_TRUNCATED = '... [truncated]'
+
 
 # ============================================================================
 # Transcript Parser
@@ -84,9 +92,10 @@ class TranscriptParser:
                     continue
                     
                 try:
-                    entry = json.loads(line)
+                    entry = _json_loads(line)
                     message = self._extract_message(entry)
-                    if message:
+                    # Skip consecutive duplicates (retry artifacts)
+                    if message and (not messages or messages[-1] != message):
                         messages.append(message)
                 except json.JSONDecodeError as e:
                     logger.warning(f"Line {line_num}: Failed to parse JSON: {e}")
@@ -160,6 +169,12 @@ class TranscriptCurator:
     Reuses the battle-tested system prompt and response parsers from Curator.
     """
 
+    # Transcripts with less conversation text than this aren't worth a curator call
+    MIN_TRANSCRIPT_CHARS = 200
+    
+    # Upper bound for an SDK curation before falling back to the CLI
+    SDK_TIMEOUT_SECONDS = 300
+
     def __init__(self,
                  method: Literal["sdk", "cli"] = "sdk",
                  cli_command: Optional[str] = None,
@@ -191,7 +206,7 @@ class TranscriptCurator:
                 # Get the correct command for this CLI type
                 self.cli_command = cli_command or get_curator_command(cli_type)
                 # Update template to match CLI type
-                template = self.config.TEMPLATES.get(cli_type, self.config.TEMPLATES['claude-code'])
+                template = self.config.resolve_templates(cli_type)
                 self.config.transcript_curation_template = template['transcript_curation']
             else:
                 self.cli_command = cli_command or self.config.curator_command
@@ -220,8 +235,9 @@ class TranscriptCurator:
         logger.info(f"   Trigger: {trigger_type}")
         logger.info(f"   Method: {self.method}")
         
-        # 1. Parse transcript to messages array
-        messages = self.parser.parse_to_messages(transcript_path)
+        # 1. Parse transcript to messages array (file I/O and JSON decoding
+        # of a possibly large transcript - keep it off the event loop)
+        messages = await asyncio.to_thread(self.parser.parse_to_messages, transcript_path)
         
         if not messages:
             logger.warning("No messages found in transcript")
@@ -232,6 +248,18 @@ class TranscriptCurator:
                 "memories": []
             }
         
+        # Skip trivial sessions: little prose and no tool activity
+        total_chars = sum(self._message_text_length(msg) for msg in messages)
+        if (total_chars < self.MIN_TRANSCRIPT_CHARS
+                and not any(self._has_tool_activity(msg) for msg in messages)):
+            logger.debug(f"Transcript too short to curate ({total_chars} chars), skipping")
+            return {
+                "session_summary": "",
+                "interaction_tone": None,
+                "project_snapshot": {},
+                "memories": []
+            }
+        
         logger.info(f"📝 Built messages array with {len(messages)} messages")
         
         # 2. Get the curation system prompt from existing Curator
@@ -269,7 +297,7 @@ class TranscriptCurator:
         
         # SDK query() accepts a prompt string, not messages array
         # Format messages as conversation for the prompt
-        conversation_text = self._format_messages_as_conversation(messages)
+        conversation_text = await asyncio.to_thread(self._format_messages_as_conversation, messages)
         
         options = ClaudeAgentOptions(
             system_prompt=system_prompt,
@@ -277,16 +305,28 @@ class TranscriptCurator:
         )
         
         response_text = ""
+        curation_json = None
         try:
-            async for message in query(prompt=conversation_text, options=options):
-                if isinstance(message, AssistantMessage):
-                    for block in message.content:
-                        if isinstance(block, TextBlock):
-                            response_text += block.text
+            # Stop reading as soon as the curation JSON is complete; aclosing
+            # shuts the SDK stream down in this task when we leave early
+            async with asyncio.timeout(self.SDK_TIMEOUT_SECONDS):
+                async with aclosing(query(prompt=conversation_text, options=options)) as stream:
+                    async for message in stream:
+                        if isinstance(message, AssistantMessage):
+                            closed_object = False
+                            for block in message.content:
+                                if isinstance(block, TextBlock):
+                                    response_text += block.text
+                                    closed_object = closed_object or '}' in block.text
+                            # Only new text that closes an object can complete the JSON
+                            if closed_object:
+                                curation_json = self._find_curation_json(response_text)
+                                if curation_json is not None:
+                                    break
         except Exception as e:
             logger.error(f"SDK query failed: {e}")
             logger.info("Falling back to CLI method...")
-            return await self._curate_via_cli(messages, system_prompt)
+            return await self._curate_via_cli(messages, system_prompt, conversation_text)
         
         logger.info("=" * 80)
         logger.info("FULL CLAUDE TRANSCRIPT CURATOR RESPONSE:")
@@ -294,19 +334,24 @@ class TranscriptCurator:
         logger.info(response_text)
         logger.info("=" * 80)
         
-        # Use Curator's battle-tested parser
+        # Use Curator's battle-tested parser, reusing the span found while streaming
         return self._curator._parse_curation_response(
-            self._extract_json(response_text)
+            curation_json or self._extract_json(response_text),
+            top_k=self._curator.config.max_memories
         )
     
     async def _curate_via_cli(self, 
                               messages: List[Dict[str, Any]],
-                              system_prompt: str) -> Dict[str, Any]:
+                              system_prompt: str,
+                              conversation_text: Optional[str] = None) -> Dict[str, Any]:
         """
         Curate using CLI subprocess.
         
         Universal method - works with claude, gemini, or any compatible CLI.
         Uses the user's subscription.
+        
+        conversation_text can be passed when the messages were already
+        formatted (e.g. falling back from the SDK) to avoid doing it twice.
         """
         # Ensure we have config for CLI method
         if not self.config:
@@ -317,7 +362,8 @@ class TranscriptCurator:
         logger.info(f"🔧 Using CLI subprocess: {self.cli_command}")
         
         # Format messages as conversation text
-        conversation_text = self._format_messages_as_conversation(messages)
+        if conversation_text is None:
+            conversation_text = await asyncio.to_thread(self._format_messages_as_conversation, messages)
         
         # Build the full prompt with system instructions + conversation
         full_prompt = f"{system_prompt}\n\n---\n\nCONVERSATION TRANSCRIPT:\n\n{conversation_text}"
@@ -328,16 +374,14 @@ class TranscriptCurator:
         logger.debug(f"CLI command: {cmd[0]} ... (prompt length: {len(full_prompt)})")
         
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            # Shares the curator's CLI concurrency limit
+            returncode, stdout, stderr = await self._curator.run_cli(
+                cmd,
+                input=self.config.prompt_stdin(self.config.transcript_curation_template, full_prompt)
             )
             
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode != 0:
-                logger.error(f"CLI failed with code {process.returncode}")
+            if returncode != 0:
+                logger.error(f"CLI failed with code {returncode}")
                 logger.error(f"Stderr: {stderr.decode()}")
                 return {
                     "session_summary": "",
@@ -346,15 +390,15 @@ class TranscriptCurator:
                     "memories": []
                 }
             
-            stdout_str = stdout.decode('utf-8').strip()
-            logger.debug(f"Raw CLI output length: {len(stdout_str)}")
-            
-            # Parse CLI output using Curator's method
+            logger.debug(f"Raw CLI output length: {len(stdout)} bytes")
+
+            # Parse CLI output using Curator's method; only plain-text
+            # output needs decoding to a str
             try:
-                output_json = json.loads(stdout_str)
+                output_json = _json_loads(stdout)
                 response_text = self._curator._extract_response_from_cli_output(output_json)
-            except json.JSONDecodeError:
-                response_text = stdout_str
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                response_text = stdout.decode('utf-8', 'replace').strip()
             
             logger.info("=" * 80)
             logger.info("FULL CLAUDE TRANSCRIPT CURATOR RESPONSE:")
@@ -364,7 +408,8 @@ class TranscriptCurator:
             
             # Use Curator's battle-tested parser
             return self._curator._parse_curation_response(
-                self._extract_json(response_text)
+                self._extract_json(response_text),
+                top_k=self._curator.config.max_memories
             )
             
         except Exception as e:
@@ -378,6 +423,31 @@ class TranscriptCurator:
                 "memories": []
             }
     
+    @staticmethod
+    def _message_text_length(message: Dict[str, Any]) -> int:
+        """Count the non-whitespace text characters in a message's content."""
+        content = message.get('content', '')
+        if isinstance(content, str):
+            return len(content.strip())
+        
+        total = 0
+        if isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict):
+                    text = block.get('text') or block.get('thinking') or ''
+                    if isinstance(text, str):
+                        total += len(text.strip())
+        return total
+    
+    @staticmethod
+    def _has_tool_activity(message: Dict[str, Any]) -> bool:
+        """Whether a message contains tool_use or tool_result blocks."""
+        content = message.get('content')
+        return isinstance(content, list) and any(
+            isinstance(block, dict) and block.get('type') in ('tool_use', 'tool_result')
+            for block in content
+        )
+    
     def _format_messages_as_conversation(self, messages: List[Dict[str, Any]]) -> str:
         """
         Format messages array as readable conversation text.
@@ -386,56 +456,66 @@ class TranscriptCurator:
         Content blocks (thinking, tool_use, etc) are included as context.
         """
         parts = []
+        append = parts.append
         
         for msg in messages:
-            role = msg.get('role', 'unknown').upper()
+            role = msg.get('role', 'unknown')
             content = msg.get('content', '')
             
-            parts.append(f"[{role}]")
+            append(_ROLE_HEADERS.get(role) or f"[{role.upper()}]")
             
             if isinstance(content, str):
-                parts.append(content)
+                append(content)
             elif isinstance(content, list):
                 # Content is array of blocks - format each
                 for block in content:
                     block_type = block.get('type', 'unknown')
                     
                     if block_type == 'text':
-                        parts.append(block.get('text', ''))
+                        append(block.get('text', ''))
                     elif block_type == 'thinking':
                         # Include thinking - it's valuable context!
                         thinking = block.get('thinking', '')
                         if thinking:
                             # Truncate very long thinking blocks
-                            if len(thinking) > 1000:
-                                thinking = thinking[:1000] + '... [truncated]'
-                            parts.append(f"[Thinking: {thinking}]")
+                            append(f"[Thinking: {truncate(thinking, 1000, suffix=_TRUNCATED)}]")
                     elif block_type == 'tool_use':
                         tool_name = block.get('name', 'unknown')
                         tool_input = block.get('input', {})
                         # Include tool input summary
                         input_preview = str(tool_input)[:200] if tool_input else ''
-                        parts.append(f"[Tool: {tool_name}] {input_preview}")
+                        append(f"[Tool: {tool_name}] {input_preview}")
                     elif block_type == 'tool_result':
                         result = block.get('content', '')
-                        if isinstance(result, str) and len(result) > 500:
-                            result = result[:500] + '... [truncated]'
-                        parts.append(f"[Tool Result: {result}]")
+                        if isinstance(result, list):
+                            # Result blocks - keep their text, not the block structure
+                            result = '\n'.join(
+                                item.get('text', '') for item in result
+                                if isinstance(item, dict) and item.get('type') == 'text'
+                            )
+                        if isinstance(result, str):
+                            result = truncate(result, 500, suffix=_TRUNCATED)
+                        append(f"[Tool Result: {result}]")
             
-            parts.append("\n---\n")
+            append("\n---\n")
         
         return '\n'.join(parts)
     
-    def _extract_json(self, text: str) -> str:
-        """Extract JSON object from response text."""
-        import re
-        
-        # Try to find JSON object
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            return json_match.group(0)
+    @staticmethod
+    def _find_curation_json(text: str) -> Optional[str]:
+        """
+        Return the complete curation JSON object in text, if there is one yet.
         
-        return text
+        raw_decode is retried at every '{', so a partial buffer is scanned
+        to its end. Nested objects (project_snapshot, memories) can decode
+        on their own before the outer object is complete, so only an object
+        with a memories key counts.
+        """
+        return _find_json_span(text, '{', required_key='memories')
+    
+    def _extract_json(self, text: str) -> str:
+        """Extract the curation JSON object from response text."""
+        return self._find_curation_json(text) or text
 
 
 # ============================================================================
@@ -0,0 +1,10 @@
+"""
+Small helpers shared across the memory engine modules.
+"""
+
+
+def truncate(text: str, limit: int, suffix: str = '...') -> str:
+    """Cut text to limit characters, appending suffix only when it was cut."""
+    if len(text) > limit:
+        return text[:limit] + suffix
+    return text